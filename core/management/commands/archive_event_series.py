@@ -1,8 +1,8 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 
-from core.models import EventSeries
-from core.services.audit import log_audit
+from core.models import AuditEvent, EventSeries
 
 
 class Command(BaseCommand):
@@ -10,11 +10,24 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         today = timezone.localdate()
-        to_archive = EventSeries.objects.filter(is_active=True, end_date__lt=today)
-        archived = 0
-        for series in to_archive:
-            series.is_active = False
-            series.save(update_fields=["is_active", "updated_at"])
-            log_audit(series.parish, None, "EventSeries", series.id, "archive", {"auto": True})
-            archived += 1
+        with transaction.atomic():
+            to_archive = list(
+                EventSeries.objects.filter(is_active=True, end_date__lt=today).values_list("id", "parish_id")
+            )
+            archived = EventSeries.objects.filter(id__in=[series_id for series_id, _ in to_archive]).update(
+                is_active=False,
+                updated_at=timezone.now(),
+            )
+            AuditEvent.objects.bulk_create(
+                [
+                    AuditEvent(
+                        parish_id=parish_id,
+                        entity_type="EventSeries",
+                        entity_id=str(series_id),
+                        action_type="archive",
+                        diff_json={"auto": True},
+                    )
+                    for series_id, parish_id in to_archive
+                ]
+            )
         self.stdout.write(self.style.SUCCESS(f"Archived {archived} event series."))
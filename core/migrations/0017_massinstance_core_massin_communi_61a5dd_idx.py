@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-17 01:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_eventseries_interest_deadline_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='massinstance',
+            index=models.Index(fields=['community', 'starts_at'], name='core_massin_communi_61a5dd_idx'),
+        ),
+    ]
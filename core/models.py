@@ -334,6 +334,9 @@ class MassInstance(TimeStampedModel):
                 name="unique_scheduled_mass_per_slot",
             )
         ]
+        indexes = [
+            models.Index(fields=["community", "starts_at"]),
+        ]
 
     def __str__(self):
         return f"{self.community.code} - {self.starts_at}"
@@ -11,3 +11,18 @@ def log_audit(parish, actor, entity_type, entity_id, action_type, diff=None):
         diff_json=diff or {},
     )
 
+
+def log_audit_many(parish, actor, entity_type, entries):
+    AuditEvent.objects.bulk_create(
+        [
+            AuditEvent(
+                parish=parish,
+                actor_user=actor,
+                entity_type=entity_type,
+                entity_id=str(entity_id),
+                action_type=action_type,
+                diff_json=diff or {},
+            )
+            for entity_id, action_type, diff in entries
+        ]
+    )
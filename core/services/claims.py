@@ -10,7 +10,7 @@ from core.services.audit import log_audit
 from core.services.availability import is_acolyte_available
 from core.services.assignments import _validate_no_conflict_in_mass
 from core.services.permissions import ADMIN_ROLE_CODES, users_with_roles
-from notifications.services import enqueue_notification
+from notifications.services import enqueue_notification, enqueue_notification_for_users
 
 
 PENDING_STATUSES = {"pending_target", "scheduled_auto_approve", "pending_coordination"}
@@ -184,14 +184,13 @@ def choose_claim(claim, actor=None, require_coordination=False):
         claim.save(update_fields=["status", "approval_mode", "auto_approve_at", "updated_at"])
         _resolve_other_claims(claim, actor=actor)
         log_audit(claim.parish, actor, "PositionClaimRequest", claim.id, "select", {"mode": "coordination"})
-        for user in users_with_roles(claim.parish, ADMIN_ROLE_CODES):
-            enqueue_notification(
-                claim.parish,
-                user,
-                "POSITION_CLAIM_COORDINATION_REQUIRED",
-                {"claim_id": claim.id},
-                idempotency_key=f"claim:{claim.id}:coordination:{user.id}",
-            )
+        enqueue_notification_for_users(
+            claim.parish,
+            users_with_roles(claim.parish, ADMIN_ROLE_CODES),
+            "POSITION_CLAIM_COORDINATION_REQUIRED",
+            {"claim_id": claim.id},
+            idempotency_prefix=f"claim:{claim.id}:coordination",
+        )
         return True
     return approve_claim(
         claim,
@@ -5,124 +5,140 @@ from django.utils import timezone
 from django.db import transaction
 
 from core.models import AuditEvent, EventInterest, EventOccurrence, MassInstance, MassOverride
-from core.services.audit import log_audit
-from core.services.slots import sync_slots_for_instance
+from core.services.audit import log_audit_many
+from core.services.slots import create_slots_for_new_instances, sync_slots_for_instance
 
 
 def _build_datetime(date_value, time_value):
     return timezone.make_aware(datetime.combine(date_value, time_value))
 
 
+def _occurrence_values(occ):
+    if isinstance(occ, EventOccurrence):
+        return {
+            "date": occ.date,
+            "time": occ.time,
+            "community_id": occ.community_id,
+            "requirement_profile_id": occ.requirement_profile_id,
+            "label": occ.label,
+            "conflict_action": occ.conflict_action,
+            "move_to_date": occ.move_to_date,
+            "move_to_time": occ.move_to_time,
+            "move_to_community_id": occ.move_to_community_id,
+        }
+    return {
+        "date": occ["date"],
+        "time": occ["time"],
+        "community_id": occ["community_id"],
+        "requirement_profile_id": occ.get("requirement_profile_id"),
+        "label": occ.get("label", ""),
+        "conflict_action": occ.get("conflict_action", "keep"),
+        "move_to_date": occ.get("move_to_date"),
+        "move_to_time": occ.get("move_to_time"),
+        "move_to_community_id": occ.get("move_to_community_id"),
+    }
+
+
 def apply_event_occurrences(event_series, occurrences, actor=None):
-    created = []
+    parish = event_series.parish
+    planned = []
+    lookup_times = set()
     for occ in occurrences:
-        if isinstance(occ, EventOccurrence):
-            date_value = occ.date
-            time_value = occ.time
-            community_id = occ.community_id
-            profile_id = occ.requirement_profile_id
-            label = occ.label
-            conflict_action = occ.conflict_action
-            move_to_date = occ.move_to_date
-            move_to_time = occ.move_to_time
-            move_to_community_id = occ.move_to_community_id
-        else:
-            date_value = occ["date"]
-            time_value = occ["time"]
-            community_id = occ["community_id"]
-            profile_id = occ.get("requirement_profile_id")
-            label = occ.get("label", "")
-            conflict_action = occ.get("conflict_action", "keep")
-            move_to_date = occ.get("move_to_date")
-            move_to_time = occ.get("move_to_time")
-            move_to_community_id = occ.get("move_to_community_id")
-
-        if not label:
-            label = event_series.title
-        starts_at = _build_datetime(date_value, time_value)
-        if conflict_action == "skip":
+        values = _occurrence_values(occ)
+        if values["conflict_action"] == "skip":
             continue
-        existing = MassInstance.objects.filter(
-            parish=event_series.parish,
-            community_id=community_id,
-            starts_at=starts_at,
-            status="scheduled",
-        ).first()
+        values["label"] = values["label"] or event_series.title
+        values["starts_at"] = _build_datetime(values["date"], values["time"])
+        lookup_times.add(values["starts_at"])
+        values["move_to"] = None
+        if values["move_to_date"] and values["move_to_time"] and values["move_to_community_id"]:
+            values["move_to"] = _build_datetime(values["move_to_date"], values["move_to_time"])
+            lookup_times.add(values["move_to"])
+        planned.append(values)
+    if not planned:
+        return []
 
-        if existing and existing.event_series_id == event_series.id:
-            updated_fields = []
-            if label and existing.liturgy_label != label:
-                existing.liturgy_label = label
-                updated_fields.append("liturgy_label")
-            if profile_id and existing.requirement_profile_id != profile_id:
-                existing.requirement_profile_id = profile_id
-                updated_fields.append("requirement_profile")
-            if updated_fields:
-                existing.save(update_fields=updated_fields + ["updated_at"])
-                log_audit(event_series.parish, actor, "MassInstance", existing.id, "update", {"event_series_id": event_series.id})
-                sync_slots_for_instance(existing)
-            continue
+    # Load every scheduled mass the batch can collide with in one query, then diff in memory.
+    scheduled = {
+        (instance.community_id, instance.starts_at): instance
+        for instance in MassInstance.objects.filter(parish=parish, starts_at__in=lookup_times, status="scheduled")
+    }
+    changed = {}
+    resync = {}
+    overrides = []
+    audit_entries = []
+    created = []
+
+    for values in planned:
+        community_id = values["community_id"]
+        profile_id = values["requirement_profile_id"]
+        label = values["label"]
+        conflict_action = values["conflict_action"]
+        starts_at = values["starts_at"]
+        existing = scheduled.get((community_id, starts_at))
 
-        if existing and conflict_action == "keep":
-            updated_fields = []
+        if existing and (existing.event_series_id == event_series.id or conflict_action == "keep"):
+            updated = False
             if existing.event_series_id != event_series.id:
                 existing.event_series = event_series
-                updated_fields.append("event_series")
+                updated = True
             if label and existing.liturgy_label != label:
                 existing.liturgy_label = label
-                updated_fields.append("liturgy_label")
+                updated = True
             if profile_id and existing.requirement_profile_id != profile_id:
                 existing.requirement_profile_id = profile_id
-                updated_fields.append("requirement_profile")
-            if updated_fields:
-                existing.save(update_fields=updated_fields + ["updated_at"])
-                log_audit(event_series.parish, actor, "MassInstance", existing.id, "update", {"event_series_id": event_series.id})
-                sync_slots_for_instance(existing)
+                updated = True
+            if updated and existing.pk:
+                changed[existing.pk] = existing
+                resync[existing.pk] = existing
+                audit_entries.append((existing, "update", {"event_series_id": event_series.id}))
             continue
 
         if existing and conflict_action == "cancel_existing":
             existing.status = "canceled"
-            existing.save(update_fields=["status", "updated_at"])
-            MassOverride.objects.create(
-                parish=event_series.parish,
-                instance=existing,
-                override_type="cancel_instance",
-                payload={"reason": "event_series", "event_series_id": event_series.id},
-                created_by=actor,
+            changed[existing.pk] = existing
+            del scheduled[(community_id, starts_at)]
+            overrides.append(
+                MassOverride(
+                    parish=parish,
+                    instance=existing,
+                    override_type="cancel_instance",
+                    payload={"reason": "event_series", "event_series_id": event_series.id},
+                    created_by=actor,
+                )
             )
-            log_audit(event_series.parish, actor, "MassInstance", existing.id, "cancel", {"event_series_id": event_series.id})
+            audit_entries.append((existing, "cancel", {"event_series_id": event_series.id}))
 
         if existing and conflict_action == "move_existing":
-            if move_to_date and move_to_time and move_to_community_id:
-                move_to = _build_datetime(move_to_date, move_to_time)
-                conflict = MassInstance.objects.filter(
-                    parish=event_series.parish,
-                    community_id=move_to_community_id,
-                    starts_at=move_to,
-                    status="scheduled",
-                ).exclude(id=existing.id).exists()
-                if conflict:
-                    raise ValueError("Conflito ao mover missa existente para o novo horario/comunidade.")
-                payload = {
-                    "from": {"starts_at": existing.starts_at.isoformat(), "community_id": existing.community_id},
-                    "to": {"starts_at": move_to.isoformat(), "community_id": move_to_community_id},
-                }
-                existing.starts_at = move_to
-                existing.community_id = move_to_community_id
-                existing.save(update_fields=["starts_at", "community", "updated_at"])
-                MassOverride.objects.create(
-                    parish=event_series.parish,
+            move_to = values["move_to"]
+            if not move_to:
+                continue
+            move_to_community_id = values["move_to_community_id"]
+            conflict = scheduled.get((move_to_community_id, move_to))
+            if conflict and conflict is not existing:
+                raise ValueError("Conflito ao mover missa existente para o novo horario/comunidade.")
+            payload = {
+                "from": {"starts_at": existing.starts_at.isoformat(), "community_id": existing.community_id},
+                "to": {"starts_at": move_to.isoformat(), "community_id": move_to_community_id},
+            }
+            del scheduled[(community_id, starts_at)]
+            existing.starts_at = move_to
+            existing.community_id = move_to_community_id
+            scheduled[(move_to_community_id, move_to)] = existing
+            changed[existing.pk] = existing
+            overrides.append(
+                MassOverride(
+                    parish=parish,
                     instance=existing,
                     override_type="move_instance",
                     payload=payload,
                     created_by=actor,
                 )
-                log_audit(event_series.parish, actor, "MassInstance", existing.id, "move", payload)
-            else:
-                continue
+            )
+            audit_entries.append((existing, "move", payload))
 
-        instance = MassInstance.objects.create(
-            parish=event_series.parish,
+        instance = MassInstance(
+            parish=parish,
             event_series=event_series,
             community_id=community_id,
             starts_at=starts_at,
@@ -132,9 +148,33 @@ def apply_event_occurrences(event_series, occurrences, actor=None):
             created_by=actor,
             updated_by=actor,
         )
+        scheduled[(community_id, starts_at)] = instance
         created.append(instance)
-        log_audit(event_series.parish, actor, "MassInstance", instance.id, "create", {"event_series_id": event_series.id})
-        sync_slots_for_instance(instance)
+
+    with transaction.atomic():
+        if changed:
+            now = timezone.now()
+            for instance in changed.values():
+                instance.updated_at = now
+            MassInstance.objects.bulk_update(
+                list(changed.values()),
+                ["event_series", "liturgy_label", "requirement_profile", "status", "starts_at", "community", "updated_at"],
+            )
+        if overrides:
+            MassOverride.objects.bulk_create(overrides)
+        if created:
+            MassInstance.objects.bulk_create(created)
+            audit_entries.extend((instance, "create", {"event_series_id": event_series.id}) for instance in created)
+        if audit_entries:
+            log_audit_many(
+                parish,
+                actor,
+                "MassInstance",
+                [(instance.id, action_type, diff) for instance, action_type, diff in audit_entries],
+            )
+        for instance in resync.values():
+            sync_slots_for_instance(instance)
+        create_slots_for_new_instances(created)
     return created
 
 
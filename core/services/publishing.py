@@ -3,7 +3,7 @@ from django.utils import timezone
 
 from core.models import Assignment, AssignmentSlot, Confirmation
 from core.services.audit import log_audit
-from notifications.services import enqueue_notification
+from notifications.services import enqueue_notifications, load_preferences
 
 
 ASSIGNMENT_PUBLISHED = "ASSIGNMENT_PUBLISHED"
@@ -11,60 +11,55 @@ CONFIRMATION_REQUESTED = "CONFIRMATION_REQUESTED"
 
 
 def publish_assignments(parish, start_date, end_date, actor=None):
-    assignments = (
+    assignments = list(
         Assignment.objects.filter(
             parish=parish,
             slot__mass_instance__starts_at__date__gte=start_date,
             slot__mass_instance__starts_at__date__lte=end_date,
             is_active=True,
+            assignment_state="proposed",
         )
-        .select_related("slot__mass_instance", "acolyte__user")
+        .select_related("slot__mass_instance__community", "slot__position_type", "acolyte__user")
         .order_by("slot__mass_instance__starts_at")
     )
 
+    preferences = load_preferences(
+        parish, [assignment.acolyte.user_id for assignment in assignments if assignment.acolyte.user_id]
+    )
     published = 0
     for assignment in assignments:
         with transaction.atomic():
             if connection.features.has_select_for_update:
                 assignment = (
                     Assignment.objects.select_for_update()
-                    .select_related("slot__mass_instance", "acolyte__user")
+                    .select_related("slot__mass_instance__community", "slot__position_type", "acolyte__user")
                     .get(id=assignment.id)
                 )
+            now = timezone.now()
             updated = Assignment.objects.filter(id=assignment.id, assignment_state="proposed").update(
                 assignment_state="published",
-                published_at=timezone.now(),
-                updated_at=timezone.now(),
+                published_at=now,
+                updated_at=now,
             )
             if not updated:
                 continue
 
             published += 1
-            slot = assignment.slot
-            if connection.features.has_select_for_update:
-                slot = AssignmentSlot.objects.select_for_update().get(id=slot.id)
-            if slot.status == "open":
-                slot.status = "assigned"
-                slot.save(update_fields=["status", "updated_at"])
+            AssignmentSlot.objects.filter(id=assignment.slot_id, status="open").update(status="assigned", updated_at=now)
             confirmation, _ = Confirmation.objects.get_or_create(parish=parish, assignment=assignment)
             if confirmation.status == "pending":
                 confirmation.updated_by = actor
                 confirmation.save(update_fields=["updated_by", "timestamp"])
             log_audit(parish, actor, "Assignment", assignment.id, "publish", {"assignment_id": assignment.id})
             if assignment.acolyte.user:
-                enqueue_notification(
-                    parish,
-                    assignment.acolyte.user,
-                    ASSIGNMENT_PUBLISHED,
-                    {"assignment_id": assignment.id},
-                    idempotency_key=f"publish:{assignment.id}",
-                )
-                enqueue_notification(
+                payload = {"assignment": assignment, "assignment_id": assignment.id}
+                enqueue_notifications(
                     parish,
-                    assignment.acolyte.user,
-                    CONFIRMATION_REQUESTED,
-                    {"assignment_id": assignment.id},
-                    idempotency_key=f"confirm:{assignment.id}",
+                    [
+                        (assignment.acolyte.user, ASSIGNMENT_PUBLISHED, payload, f"publish:{assignment.id}", "email"),
+                        (assignment.acolyte.user, CONFIRMATION_REQUESTED, payload, f"confirm:{assignment.id}", "email"),
+                    ],
+                    preferences=preferences,
                 )
     return published
 
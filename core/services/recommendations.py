@@ -1,3 +1,4 @@
+import heapq
 from collections import defaultdict
 from datetime import timedelta
 
@@ -110,9 +111,10 @@ def build_recommendation_cache(parish, slots=None, acolytes=None, now=None):
     rotation_days = int(_get_weight(weights, "rotation_days", 60) or 0)
     community_recent_window_days = int(_get_weight(weights, "community_recent_window_days", 30) or 0)
 
+    stats_joined = acolytes is None
     if acolytes is None:
         acolytes = list(
-            parish.acolytes.filter(active=True).select_related("community_of_origin", "family_group")
+            parish.acolytes.filter(active=True).select_related("community_of_origin", "family_group", "acolytestats")
         )
     else:
         acolytes = list(acolytes)
@@ -131,9 +133,9 @@ def build_recommendation_cache(parish, slots=None, acolytes=None, now=None):
 
     qualified_by_position = defaultdict(set)
     qualified_pairs = {}
-    for qual in qualifications:
-        qualified_by_position[qual.position_type_id].add(qual.acolyte_id)
-        qualified_pairs[(qual.acolyte_id, qual.position_type_id)] = True
+    for acolyte_id, position_type_id in qualifications.values_list("acolyte_id", "position_type_id"):
+        qualified_by_position[position_type_id].add(acolyte_id)
+        qualified_pairs[(acolyte_id, position_type_id)] = True
 
     preferences = AcolytePreference.objects.filter(parish=parish, acolyte_id__in=acolyte_ids)
     pref_by_acolyte = defaultdict(list)
@@ -146,14 +148,28 @@ def build_recommendation_cache(parish, slots=None, acolytes=None, now=None):
         if pref.preference_type == "preferred_community" and pref.target_community_id:
             preferred_communities[pref.acolyte_id].add(pref.target_community_id)
 
-    stats_map = {stat.acolyte_id: stat for stat in AcolyteStats.objects.filter(parish=parish)}
+    if stats_joined:
+        # Stats were joined onto the acolyte query above.
+        stats_map = {}
+        for acolyte in acolytes:
+            stat = getattr(acolyte, "acolytestats", None)
+            if stat is not None:
+                stats_map[acolyte.id] = stat
+    else:
+        stats_map = {
+            stat.acolyte_id: stat
+            for stat in AcolyteStats.objects.filter(parish=parish, acolyte_id__in=acolyte_ids).only(
+                "acolyte_id", "reliability_score", "services_last_30_days", "credit_balance"
+            )
+        }
     availability_rules = AcolyteAvailabilityRule.objects.filter(parish=parish, acolyte_id__in=acolyte_ids)
     rules_by_acolyte = group_rules_by_acolyte(availability_rules)
 
     interest_map = defaultdict(set)
     if mass_instance_ids:
-        for interest in MassInterest.objects.filter(parish=parish, interested=True, mass_instance_id__in=mass_instance_ids):
-            interest_map[interest.mass_instance_id].add(interest.acolyte_id)
+        interests = MassInterest.objects.filter(parish=parish, interested=True, mass_instance_id__in=mass_instance_ids)
+        for mass_instance_id, acolyte_id in interests.values_list("mass_instance_id", "acolyte_id"):
+            interest_map[mass_instance_id].add(acolyte_id)
 
     starts = [slot.mass_instance.starts_at for slot in slots] if slots else []
     if starts:
@@ -170,6 +186,7 @@ def build_recommendation_cache(parish, slots=None, acolytes=None, now=None):
     assignments = (
         Assignment.objects.filter(
             parish=parish,
+            acolyte_id__in=acolyte_ids,
             is_active=True,
             assignment_state__in=["proposed", "published", "locked"],
             slot__mass_instance__starts_at__gte=window_start,
@@ -220,6 +237,7 @@ def build_recommendation_cache(parish, slots=None, acolytes=None, now=None):
         "preferred_communities": preferred_communities,
         "stats_map": stats_map,
         "rules_by_acolyte": rules_by_acolyte,
+        "availability": {},
         "interest_map": interest_map,
         "assignments_by_acolyte": assignments_by_acolyte,
         "weekly_counts_by_acolyte": weekly_counts_by_acolyte,
@@ -281,12 +299,29 @@ def _would_exceed_consecutive_weekends(existing_weekends, weekend_date, max_cons
     return count > max_consecutive
 
 
+def qualified_acolytes(cache, position_type_id):
+    # Per-position subset of cache["acolytes"] (same order), so slot loops skip unqualified acolytes.
+    by_position = cache.setdefault("qualified_acolytes_by_position", {})
+    acolytes = by_position.get(position_type_id)
+    if acolytes is None:
+        qualified_ids = cache["qualified_by_position"].get(position_type_id, set())
+        acolytes = [acolyte for acolyte in cache["acolytes"] if acolyte.id in qualified_ids]
+        by_position[position_type_id] = acolytes
+    return acolytes
+
+
 def is_candidate_eligible_static(acolyte, slot, context, cache, exclude_acolyte_ids=None):
     if exclude_acolyte_ids and acolyte.id in exclude_acolyte_ids:
         return False
     if not cache["qualified_pairs"].get((acolyte.id, slot.position_type_id)):
         return False
-    if not is_acolyte_available_with_rules(cache["rules_by_acolyte"].get(acolyte.id, []), slot.mass_instance):
+    # Every slot of a mass shares the same answer, so evaluate the rules once per (acolyte, mass).
+    availability_key = (acolyte.id, slot.mass_instance_id)
+    available = cache["availability"].get(availability_key)
+    if available is None:
+        available = is_acolyte_available_with_rules(cache["rules_by_acolyte"].get(acolyte.id, []), slot.mass_instance)
+        cache["availability"][availability_key] = available
+    if not available:
         return False
 
     pool_mode = context.get("pool_mode")
@@ -338,25 +373,78 @@ def is_candidate_eligible_dynamic(acolyte, slot, cache):
     return True
 
 
-def score_candidate(acolyte, slot, context, cache, local_eligible_count=0):
-    weights = cache["weights"] or {}
+def _score_params(cache):
+    # Weight lookups are the same for every candidate; resolve them once per cache and weights dict.
+    weights = cache["weights"]
+    params = cache.get("score_params")
+    if params is not None and params["weights"] is weights:
+        return params
+    weights = weights or {}
+    params = {
+        "weights": cache["weights"],
+        "home_bonus": int(_get_weight(weights, "home_community_bonus", 40) or 0),
+        "scarcity_bonus": int(_get_weight(weights, "scarcity_bonus", 15) or 0),
+        "community_recent_penalty": int(_get_weight(weights, "community_recent_penalty", 6) or 0),
+        "recent_window": int(_get_weight(weights, "community_recent_window_days", 30) or 0),
+        "rotation_days": int(_get_weight(weights, "rotation_days", 60) or 0),
+        "rotation_penalty": int(_get_weight(weights, "rotation_penalty", 3) or 0),
+        "reserve_penalty": int(_get_weight(weights, "reserve_penalty", 1000) or 0),
+        "credit_weight": int(_get_weight(weights, "credit_weight", 1) or 0),
+        "credit_cap": int(_get_weight(weights, "credit_cap", 10) or 10),
+        "reliability_penalty": int(_get_weight(weights, "reliability_penalty", 0) or 0),
+        "acolyte_bonus": {},
+    }
+    cache["score_params"] = params
+    return params
+
+
+def _acolyte_bonus(acolyte, cache, params):
+    # Reserve, credit, reliability and workload terms depend only on the acolyte, not the slot.
+    bonus = params["acolyte_bonus"].get(acolyte.id)
+    if bonus is not None:
+        return bonus
     stats = cache["stats_map"].get(acolyte.id)
-    preferences = cache["pref_by_acolyte"].get(acolyte.id, [])
     reliability_score = int(stats.reliability_score) if stats else 100
     services_last_30 = int(stats.services_last_30_days) if stats else 0
     credit_balance = int(stats.credit_balance or 0) if stats else 0
 
-    breakdown = preference_score_breakdown(acolyte, slot.mass_instance, slot, preferences)
-    community_factor = context.get("community_factor", 1.0)
-    community_score = breakdown["community"] * community_factor
-    base_score = breakdown["other"] + community_score
+    bonus = 0
+    if acolyte.scheduling_mode == "reserve":
+        bonus -= params["reserve_penalty"]
+
+    credit_weight = params["credit_weight"]
+    if credit_weight:
+        credit_bonus = min(max(credit_balance, 0), params["credit_cap"])
+        bonus += credit_weight * credit_bonus
+
+    reliability_penalty = params["reliability_penalty"]
+    if reliability_penalty:
+        penalty = int(reliability_penalty * (100 - reliability_score) / 100)
+        bonus -= penalty
+    else:
+        bonus += int(reliability_score / 25)
+
+    bonus += max(0, 10 - int(services_last_30 / 2))
+    params["acolyte_bonus"][acolyte.id] = bonus
+    return bonus
 
-    home_bonus = int(_get_weight(weights, "home_community_bonus", 40) or 0)
+
+def score_candidate(acolyte, slot, context, cache, local_eligible_count=0):
+    params = _score_params(cache)
+    community_factor = context.get("community_factor", 1.0)
+    # Most acolytes have no preferences; skip the breakdown for them instead of scoring an empty list.
+    base_score = 0
+    preferences = cache["pref_by_acolyte"].get(acolyte.id)
+    if preferences:
+        breakdown = preference_score_breakdown(acolyte, slot.mass_instance, slot, preferences)
+        base_score = breakdown["other"] + breakdown["community"] * community_factor
+
+    home_bonus = params["home_bonus"]
     if acolyte.community_of_origin_id == slot.mass_instance.community_id:
         if slot.mass_instance.community_id not in cache["avoid_communities"].get(acolyte.id, set()):
             base_score += int(home_bonus * community_factor)
 
-    scarcity_bonus = int(_get_weight(weights, "scarcity_bonus", 15) or 0)
+    scarcity_bonus = params["scarcity_bonus"]
     if local_eligible_count and local_eligible_count <= 2:
         if acolyte.community_of_origin_id == slot.mass_instance.community_id:
             if local_eligible_count == 1:
@@ -364,8 +452,8 @@ def score_candidate(acolyte, slot, context, cache, local_eligible_count=0):
             else:
                 base_score += int(round(scarcity_bonus / 2))
 
-    community_recent_penalty = int(_get_weight(weights, "community_recent_penalty", 6) or 0)
-    recent_window = int(_get_weight(weights, "community_recent_window_days", 30) or 0)
+    community_recent_penalty = params["community_recent_penalty"]
+    recent_window = params["recent_window"]
     if community_recent_penalty and recent_window > 0:
         window_start = slot.mass_instance.starts_at - timedelta(days=recent_window)
         window_end = slot.mass_instance.starts_at
@@ -373,8 +461,8 @@ def score_candidate(acolyte, slot, context, cache, local_eligible_count=0):
         recent_count = _count_within_window(times, window_start, window_end)
         base_score -= community_recent_penalty * recent_count
 
-    rotation_days = int(_get_weight(weights, "rotation_days", 60) or 0)
-    rotation_penalty = int(_get_weight(weights, "rotation_penalty", 3) or 0)
+    rotation_days = params["rotation_days"]
+    rotation_penalty = params["rotation_penalty"]
     if rotation_days > 0 and rotation_penalty:
         window_start = slot.mass_instance.starts_at - timedelta(days=rotation_days)
         window_end = slot.mass_instance.starts_at
@@ -382,26 +470,7 @@ def score_candidate(acolyte, slot, context, cache, local_eligible_count=0):
         if _has_recent_rotation(rotation_times, window_start, window_end):
             base_score -= rotation_penalty
 
-    reserve_penalty = int(_get_weight(weights, "reserve_penalty", 1000) or 0)
-    if acolyte.scheduling_mode == "reserve":
-        base_score -= reserve_penalty
-
-    credit_weight = int(_get_weight(weights, "credit_weight", 1) or 0)
-    credit_cap = int(_get_weight(weights, "credit_cap", 10) or 10)
-    if credit_weight:
-        credit_bonus = min(max(credit_balance, 0), credit_cap)
-        base_score += credit_weight * credit_bonus
-
-    reliability_penalty = int(_get_weight(weights, "reliability_penalty", 0) or 0)
-    if reliability_penalty:
-        penalty = int(reliability_penalty * (100 - reliability_score) / 100)
-        base_score -= penalty
-    else:
-        base_score += int(reliability_score / 25)
-
-    base_score += max(0, 10 - int(services_last_30 / 2))
-
-    return base_score
+    return base_score + _acolyte_bonus(acolyte, cache, params)
 
 
 def rank_candidates(
@@ -419,7 +488,7 @@ def rank_candidates(
     context = get_mass_context(slot.mass_instance, cache["weights"], cache.get("interest_map"), cache["now"])
 
     eligible_acolytes = []
-    for acolyte in cache["acolytes"]:
+    for acolyte in qualified_acolytes(cache, slot.position_type_id):
         if query and query.lower() not in acolyte.display_name.lower():
             continue
         if not is_candidate_eligible_static(acolyte, slot, context, cache, exclude_acolyte_ids=exclude_acolyte_ids):
@@ -441,9 +510,11 @@ def rank_candidates(
         score = score_candidate(acolyte, slot, context, cache, local_eligible_count=local_eligible_count)
         scored.append((score, acolyte))
 
-    scored.sort(key=lambda item: item[0], reverse=True)
     if max_candidates:
-        scored = scored[: int(max_candidates)]
+        # Same order as a stable descending sort, without sorting the whole candidate list.
+        scored = heapq.nlargest(int(max_candidates), scored, key=lambda item: item[0])
+    else:
+        scored.sort(key=lambda item: item[0], reverse=True)
 
     if not include_meta:
         return [acolyte for _score, acolyte in scored]
@@ -475,7 +546,7 @@ def build_candidate_map(slots, parish, cache=None):
             deferred.append(slot)
             continue
         slot_candidates = []
-        for acolyte in cache["acolytes"]:
+        for acolyte in qualified_acolytes(cache, slot.position_type_id):
             if not is_candidate_eligible_static(acolyte, slot, context, cache):
                 continue
             slot_candidates.append(acolyte)
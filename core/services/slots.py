@@ -1,44 +1,76 @@
-from core.models import AssignmentSlot
+from collections import defaultdict
+
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from core.models import Assignment, AssignmentSlot, RequirementProfilePosition
 from core.services.assignments import deactivate_assignment
 
 
+def _finalize_slots(slots):
+    if not slots:
+        return
+    active_by_slot = {
+        assignment.slot_id: assignment
+        for assignment in Assignment.objects.filter(slot__in=slots, is_active=True).select_related("parish")
+    }
+    now = timezone.now()
+    for slot in slots:
+        assignment = active_by_slot.get(slot.id)
+        if assignment:
+            deactivate_assignment(assignment, "manual_unassign")
+        slot.required = False
+        slot.externally_covered = False
+        slot.external_coverage_notes = ""
+        slot.status = "finalized"
+        slot.updated_at = now
+    AssignmentSlot.objects.bulk_update(
+        slots,
+        [
+            "required",
+            "externally_covered",
+            "external_coverage_notes",
+            "status",
+            "updated_at",
+        ],
+    )
+
+
 def sync_slots_for_instance(instance):
     if not instance.requirement_profile:
-        slots = AssignmentSlot.objects.filter(mass_instance=instance)
-        for slot in slots:
-            assignment = slot.get_active_assignment()
-            if assignment:
-                deactivate_assignment(assignment, "manual_unassign")
-            slot.required = False
-            slot.externally_covered = False
-            slot.external_coverage_notes = ""
-            slot.status = "finalized"
-            slot.save(
-                update_fields=[
-                    "required",
-                    "externally_covered",
-                    "external_coverage_notes",
-                    "status",
-                    "updated_at",
-                ]
-            )
+        _finalize_slots(list(AssignmentSlot.objects.filter(mass_instance=instance)))
         return []
 
+    existing = {
+        (slot.position_type_id, slot.slot_index): slot
+        for slot in AssignmentSlot.objects.filter(mass_instance=instance).prefetch_related(
+            Prefetch(
+                "assignments",
+                queryset=Assignment.objects.filter(is_active=True),
+                to_attr="active_assignments",
+            )
+        )
+    }
     desired = set()
-    created = []
-    for position in instance.requirement_profile.positions.select_related("position_type").all():
+    missing = []
+    for position in instance.requirement_profile.positions.all():
         for idx in range(1, position.quantity + 1):
-            desired.add((position.position_type_id, idx))
-            slot, was_created = AssignmentSlot.objects.get_or_create(
-                parish=instance.parish,
-                mass_instance=instance,
-                position_type=position.position_type,
-                slot_index=idx,
-                defaults={"required": True, "status": "open"},
-            )
-            if was_created:
-                created.append(slot)
-            elif not slot.required:
+            key = (position.position_type_id, idx)
+            desired.add(key)
+            slot = existing.get(key)
+            if slot is None:
+                missing.append(
+                    AssignmentSlot(
+                        parish_id=instance.parish_id,
+                        mass_instance=instance,
+                        position_type_id=position.position_type_id,
+                        slot_index=idx,
+                        required=True,
+                        status="open",
+                    )
+                )
+                continue
+            if not slot.required:
                 assignment = slot.get_active_assignment()
                 slot.required = True
                 slot.externally_covered = False
@@ -57,27 +89,51 @@ def sync_slots_for_instance(instance):
                     ]
                 )
 
-    for slot in AssignmentSlot.objects.filter(mass_instance=instance):
-        if (slot.position_type_id, slot.slot_index) not in desired and slot.required:
-            assignment = slot.get_active_assignment()
-            if assignment:
-                deactivate_assignment(assignment, "manual_unassign")
-            slot.required = False
-            slot.externally_covered = False
-            slot.external_coverage_notes = ""
-            slot.status = "finalized"
-            slot.save(
-                update_fields=[
-                    "required",
-                    "externally_covered",
-                    "external_coverage_notes",
-                    "status",
-                    "updated_at",
-                ]
+    created = []
+    if missing:
+        # Slots inserted concurrently are skipped by the (mass_instance, position_type, slot_index) constraint.
+        AssignmentSlot.objects.bulk_create(missing, ignore_conflicts=True)
+        missing_keys = {(slot.position_type_id, slot.slot_index) for slot in missing}
+        created = [
+            slot
+            for slot in AssignmentSlot.objects.filter(mass_instance=instance).exclude(
+                id__in=[slot.id for slot in existing.values()]
             )
+            if (slot.position_type_id, slot.slot_index) in missing_keys
+        ]
+
+    _finalize_slots(
+        [slot for key, slot in existing.items() if key not in desired and slot.required]
+    )
     return created
 
 
+def create_slots_for_new_instances(instances):
+    profile_ids = {instance.requirement_profile_id for instance in instances if instance.requirement_profile_id}
+    if not profile_ids:
+        return
+    positions_by_profile = defaultdict(list)
+    for profile_id, position_type_id, quantity in RequirementProfilePosition.objects.filter(
+        profile_id__in=profile_ids
+    ).values_list("profile_id", "position_type_id", "quantity"):
+        positions_by_profile[profile_id].append((position_type_id, quantity))
+    slots = [
+        AssignmentSlot(
+            parish_id=instance.parish_id,
+            mass_instance=instance,
+            position_type_id=position_type_id,
+            slot_index=idx,
+            required=True,
+            status="open",
+        )
+        for instance in instances
+        for position_type_id, quantity in positions_by_profile.get(instance.requirement_profile_id, [])
+        for idx in range(1, quantity + 1)
+    ]
+    if slots:
+        AssignmentSlot.objects.bulk_create(slots, ignore_conflicts=True)
+
+
 def sync_slots_for_parish(parish, start_date, end_date):
     from core.models import MassInstance
 
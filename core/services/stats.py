@@ -1,68 +1,108 @@
 from datetime import timedelta
 
-from django.db import models
-from django.db.models import F, Q
+from django.db.models import Count, F, Max, Q, Sum
 from django.utils import timezone
 
 from core.models import AcolyteCreditLedger, AcolyteProfile, AcolyteStats, Assignment, Confirmation
 
+STATS_FIELDS = [
+    "services_last_30_days",
+    "services_last_90_days",
+    "confirmation_rate",
+    "cancellations_rate",
+    "no_show_count",
+    "credit_balance",
+    "reliability_score",
+    "last_served_at",
+    "updated_at",
+]
+
 
 def recompute_stats(parish):
     now = timezone.now()
     start_30 = now - timedelta(days=30)
     start_90 = now - timedelta(days=90)
-    assignments = Assignment.objects.filter(parish=parish, assignment_state__in=["published", "locked"])
-    active_at_service = assignments.filter(
-        created_at__lte=F("slot__mass_instance__starts_at")
-    ).filter(
-        Q(ended_at__isnull=True) | Q(ended_at__gte=F("slot__mass_instance__starts_at"))
-    )
     acolyte_ids = list(
         AcolyteProfile.objects.filter(parish=parish, active=True).values_list("id", flat=True)
     )
-    for acolyte_id in acolyte_ids:
-        recent_30 = active_at_service.filter(
-            acolyte_id=acolyte_id, slot__mass_instance__starts_at__gte=start_30, slot__mass_instance__starts_at__lte=now
-        ).count()
-        recent_90 = active_at_service.filter(
-            acolyte_id=acolyte_id, slot__mass_instance__starts_at__gte=start_90, slot__mass_instance__starts_at__lte=now
-        ).count()
-        confirmations = Confirmation.objects.filter(
+    if not acolyte_ids:
+        return True
+
+    starts_at = "slot__mass_instance__starts_at"
+    services = {
+        row["acolyte_id"]: row
+        for row in Assignment.objects.filter(
+            parish=parish,
+            assignment_state__in=["published", "locked"],
+            acolyte_id__in=acolyte_ids,
+            created_at__lte=F(starts_at),
+        )
+        .filter(Q(ended_at__isnull=True) | Q(ended_at__gte=F(starts_at)))
+        .values("acolyte_id")
+        .annotate(
+            recent_30=Count("id", filter=Q(**{f"{starts_at}__gte": start_30, f"{starts_at}__lte": now})),
+            recent_90=Count("id", filter=Q(**{f"{starts_at}__gte": start_90, f"{starts_at}__lte": now})),
+            last_served_at=Max(starts_at),
+        )
+    }
+    confirmations = {
+        row["assignment__acolyte_id"]: row
+        for row in Confirmation.objects.filter(
             parish=parish,
-            assignment__acolyte_id=acolyte_id,
+            assignment__acolyte_id__in=acolyte_ids,
             assignment__assignment_state__in=["published", "locked"],
             assignment__slot__mass_instance__starts_at__gte=start_90,
             assignment__slot__mass_instance__starts_at__lte=now,
         )
-        total_confirmations = confirmations.count()
-        confirmed = confirmations.filter(status="confirmed").count()
-        canceled = confirmations.filter(status__in=["declined", "canceled_by_acolyte"]).count()
-        no_show = confirmations.filter(status="no_show").count()
-        confirmation_rate = (confirmed / total_confirmations) if total_confirmations else 0.0
-        cancellations_rate = (canceled / total_confirmations) if total_confirmations else 0.0
-        credit_balance = (
-            AcolyteCreditLedger.objects.filter(parish=parish, acolyte_id=acolyte_id)
-            .aggregate(total=models.Sum("delta"))
-            .get("total")
-            or 0
+        .values("assignment__acolyte_id")
+        .annotate(
+            total=Count("id"),
+            confirmed=Count("id", filter=Q(status="confirmed")),
+            canceled=Count("id", filter=Q(status__in=["declined", "canceled_by_acolyte"])),
+            no_show=Count("id", filter=Q(status="no_show")),
         )
-        reliability_score = max(0.0, 100.0 - (cancellations_rate * 50.0) - (no_show * 5.0))
-        AcolyteStats.objects.update_or_create(
-            parish=parish,
-            acolyte_id=acolyte_id,
-            defaults={
-                "services_last_30_days": recent_30,
-                "services_last_90_days": recent_90,
-                "confirmation_rate": confirmation_rate,
-                "cancellations_rate": cancellations_rate,
-                "no_show_count": no_show,
-                "credit_balance": credit_balance,
-                "reliability_score": reliability_score,
-                "last_served_at": active_at_service.filter(acolyte_id=acolyte_id)
-                .order_by("-slot__mass_instance__starts_at")
-                .values_list("slot__mass_instance__starts_at", flat=True)
-                .first(),
-            },
-        )
-    return True
+    }
+    balances = dict(
+        AcolyteCreditLedger.objects.filter(parish=parish, acolyte_id__in=acolyte_ids)
+        .values("acolyte_id")
+        .annotate(total=Sum("delta"))
+        .values_list("acolyte_id", "total")
+    )
+    existing = {
+        stats.acolyte_id: stats
+        for stats in AcolyteStats.objects.filter(parish=parish, acolyte_id__in=acolyte_ids)
+    }
 
+    to_create = []
+    to_update = []
+    for acolyte_id in acolyte_ids:
+        served = services.get(acolyte_id, {})
+        confirmation = confirmations.get(acolyte_id, {})
+        total_confirmations = confirmation.get("total", 0)
+        no_show = confirmation.get("no_show", 0)
+        confirmation_rate = (confirmation["confirmed"] / total_confirmations) if total_confirmations else 0.0
+        cancellations_rate = (confirmation["canceled"] / total_confirmations) if total_confirmations else 0.0
+        values = {
+            "services_last_30_days": served.get("recent_30", 0),
+            "services_last_90_days": served.get("recent_90", 0),
+            "confirmation_rate": confirmation_rate,
+            "cancellations_rate": cancellations_rate,
+            "no_show_count": no_show,
+            "credit_balance": balances.get(acolyte_id) or 0,
+            "reliability_score": max(0.0, 100.0 - (cancellations_rate * 50.0) - (no_show * 5.0)),
+            "last_served_at": served.get("last_served_at"),
+            "updated_at": now,
+        }
+        stats = existing.get(acolyte_id)
+        if stats is None:
+            to_create.append(AcolyteStats(parish=parish, acolyte_id=acolyte_id, **values))
+            continue
+        for field, value in values.items():
+            setattr(stats, field, value)
+        to_update.append(stats)
+
+    if to_update:
+        AcolyteStats.objects.bulk_update(to_update, STATS_FIELDS)
+    if to_create:
+        AcolyteStats.objects.bulk_create(to_create)
+    return True
@@ -8,14 +8,15 @@ from core.services.availability import is_acolyte_available
 
 
 class AvailabilityRuleTests(TestCase):
-    def setUp(self):
-        self.parish = Parish.objects.create(name="Parish")
-        self.community_a = Community.objects.create(parish=self.parish, code="MAT", name="Matriz")
-        self.community_b = Community.objects.create(parish=self.parish, code="STM", name="Comunidade")
-        self.acolyte = AcolyteProfile.objects.create(parish=self.parish, display_name="Acolito")
-        self.tz = timezone.get_current_timezone()
-        self.monday = datetime(2026, 2, 9, 10, 0, tzinfo=self.tz)
-        self.tuesday = datetime(2026, 2, 10, 10, 0, tzinfo=self.tz)
+    @classmethod
+    def setUpTestData(cls):
+        cls.parish = Parish.objects.create(name="Parish")
+        cls.community_a = Community.objects.create(parish=cls.parish, code="MAT", name="Matriz")
+        cls.community_b = Community.objects.create(parish=cls.parish, code="STM", name="Comunidade")
+        cls.acolyte = AcolyteProfile.objects.create(parish=cls.parish, display_name="Acolito")
+        cls.tz = timezone.get_current_timezone()
+        cls.monday = datetime(2026, 2, 9, 10, 0, tzinfo=cls.tz)
+        cls.tuesday = datetime(2026, 2, 10, 10, 0, tzinfo=cls.tz)
 
     def _instance_at(self, when, community):
         return MassInstance.objects.create(
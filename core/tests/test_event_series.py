@@ -1,64 +1,75 @@
-from datetime import date, datetime, time
+from datetime import date, datetime, time, timedelta
 
 from django.test import TestCase
 from django.utils import timezone
 
-from core.models import Community, EventSeries, MassInstance, Parish, RequirementProfile
+from core.models import (
+    AssignmentSlot,
+    Community,
+    EventSeries,
+    MassInstance,
+    Parish,
+    PositionType,
+    RequirementProfile,
+    RequirementProfilePosition,
+)
 from core.services.event_series import apply_event_occurrences
 
 
 class EventSeriesConflictTests(TestCase):
-    def setUp(self):
-        self.parish = Parish.objects.create(name="Parish")
-        self.community = Community.objects.create(parish=self.parish, code="MAT", name="Matriz")
-        self.profile = RequirementProfile.objects.create(parish=self.parish, name="Simple")
-        self.series = EventSeries.objects.create(
-            parish=self.parish,
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = date.today()
+        cls.starts_at_19 = timezone.make_aware(datetime.combine(cls.today, time(19, 0)))
+        cls.parish = Parish.objects.create(name="Parish")
+        cls.community = Community.objects.create(parish=cls.parish, code="MAT", name="Matriz")
+        cls.profile = RequirementProfile.objects.create(parish=cls.parish, name="Simple")
+        cls.series = EventSeries.objects.create(
+            parish=cls.parish,
             series_type="novena",
             title="Novena",
-            start_date=date.today(),
-            end_date=date.today(),
-            default_community=self.community,
+            start_date=cls.today,
+            end_date=cls.today,
+            default_community=cls.community,
         )
 
     def test_keep_conflict_does_not_duplicate(self):
-        starts_at = timezone.make_aware(datetime.combine(date.today(), time(19, 0)))
         existing = MassInstance.objects.create(
             parish=self.parish,
             community=self.community,
-            starts_at=starts_at,
+            starts_at=self.starts_at_19,
             status="scheduled",
         )
-        apply_event_occurrences(
-            self.series,
-            [
-                {
-                    "date": date.today(),
-                    "time": time(19, 0),
-                    "community_id": self.community.id,
-                    "requirement_profile_id": self.profile.id,
-                    "label": "Novena",
-                    "conflict_action": "keep",
-                }
-            ],
-        )
+        with self.assertNumQueries(8):
+            apply_event_occurrences(
+                self.series,
+                [
+                    {
+                        "date": self.today,
+                        "time": time(19, 0),
+                        "community_id": self.community.id,
+                        "requirement_profile_id": self.profile.id,
+                        "label": "Novena",
+                        "conflict_action": "keep",
+                    }
+                ],
+            )
         self.assertEqual(MassInstance.objects.filter(parish=self.parish).count(), 1)
         existing.refresh_from_db()
         self.assertEqual(existing.event_series_id, self.series.id)
 
     def test_cancel_existing_creates_new(self):
-        starts_at = timezone.make_aware(datetime.combine(date.today(), time(19, 0)))
         existing = MassInstance.objects.create(
             parish=self.parish,
             community=self.community,
-            starts_at=starts_at,
+            starts_at=self.starts_at_19,
             status="scheduled",
         )
         apply_event_occurrences(
             self.series,
             [
                 {
-                    "date": date.today(),
+                    "date": self.today,
                     "time": time(19, 0),
                     "community_id": self.community.id,
                     "requirement_profile_id": self.profile.id,
@@ -76,7 +87,7 @@ class EventSeriesConflictTests(TestCase):
             self.series,
             [
                 {
-                    "date": date.today(),
+                    "date": self.today,
                     "time": time(19, 0),
                     "community_id": self.community.id,
                     "requirement_profile_id": self.profile.id,
@@ -92,7 +103,7 @@ class EventSeriesConflictTests(TestCase):
             self.series,
             [
                 {
-                    "date": date.today(),
+                    "date": self.today,
                     "time": time(19, 0),
                     "community_id": self.community.id,
                     "requirement_profile_id": self.profile.id,
@@ -105,19 +116,18 @@ class EventSeriesConflictTests(TestCase):
         self.assertEqual(instance.liturgy_label, self.series.title)
 
     def test_move_existing_creates_new_and_moves_original(self):
-        starts_at = timezone.make_aware(datetime.combine(date.today(), time(19, 0)))
-        move_to_date = date.today()
+        move_to_date = self.today
         existing = MassInstance.objects.create(
             parish=self.parish,
             community=self.community,
-            starts_at=starts_at,
+            starts_at=self.starts_at_19,
             status="scheduled",
         )
         apply_event_occurrences(
             self.series,
             [
                 {
-                    "date": date.today(),
+                    "date": self.today,
                     "time": time(19, 0),
                     "community_id": self.community.id,
                     "requirement_profile_id": self.profile.id,
@@ -133,3 +143,26 @@ class EventSeriesConflictTests(TestCase):
         existing.refresh_from_db()
         self.assertEqual(existing.starts_at, timezone.make_aware(datetime.combine(move_to_date, time(20, 0))))
 
+    def test_bulk_occurrences_use_constant_queries(self):
+        lib = PositionType.objects.create(parish=self.parish, code="LIB", name="Libriferario")
+        cer = PositionType.objects.create(parish=self.parish, code="CER", name="Ceroferario")
+        profile = RequirementProfile.objects.create(parish=self.parish, name="Novena")
+        RequirementProfilePosition.objects.create(profile=profile, position_type=lib, quantity=2)
+        RequirementProfilePosition.objects.create(profile=profile, position_type=cer, quantity=2)
+        for count, hour in ((3, 8), (10, 19)):
+            occurrences = [
+                {
+                    "date": self.today + timedelta(days=offset),
+                    "time": time(hour, 0),
+                    "community_id": self.community.id,
+                    "requirement_profile_id": profile.id,
+                    "label": "Novena",
+                    "conflict_action": "keep",
+                }
+                for offset in range(count)
+            ]
+            # Lookup, mass insert, audit insert, profile positions, slot insert and the savepoint pair.
+            with self.subTest(count=count), self.assertNumQueries(7):
+                created = apply_event_occurrences(self.series, occurrences)
+            self.assertEqual(len(created), count)
+            self.assertEqual(AssignmentSlot.objects.filter(mass_instance__in=created, required=True).count(), count * 4)
@@ -2,7 +2,7 @@ from datetime import timedelta
 import base64
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from django.utils import timezone
 from rest_framework.test import APIClient
@@ -10,58 +10,63 @@ from rest_framework.test import APIClient
 from core.models import Community, MassInstance, Parish, ParishMembership
 
 
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
 class ParishIsolationTests(TestCase):
-    def setUp(self):
-        self.user = get_user_model().objects.create_user(email="user@example.com", full_name="User", password="pass")
-        self.parish1 = Parish.objects.create(name="Parish 1")
-        self.parish2 = Parish.objects.create(name="Parish 2")
-        self.community1 = Community.objects.create(parish=self.parish1, code="A", name="A")
-        self.community2 = Community.objects.create(parish=self.parish2, code="B", name="B")
-        ParishMembership.objects.create(parish=self.parish1, user=self.user)
+    client_class = APIClient
 
-        MassInstance.objects.create(
-            parish=self.parish1,
-            community=self.community1,
-            starts_at=timezone.now() + timedelta(days=1),
-            status="scheduled",
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email="user@example.com", full_name="User", password="pass")
+        cls.parish1, cls.parish2 = Parish.objects.bulk_create([Parish(name="Parish 1"), Parish(name="Parish 2")])
+        cls.community1, cls.community2 = Community.objects.bulk_create(
+            [
+                Community(parish=cls.parish1, code="A", name="A"),
+                Community(parish=cls.parish2, code="B", name="B"),
+            ]
         )
-        MassInstance.objects.create(
-            parish=self.parish2,
-            community=self.community2,
-            starts_at=timezone.now() + timedelta(days=2),
-            status="scheduled",
+        ParishMembership.objects.create(parish=cls.parish1, user=cls.user)
+        cls.basic_auth = "Basic " + base64.b64encode(b"user@example.com:pass").decode("utf-8")
+
+        MassInstance.objects.bulk_create(
+            [
+                MassInstance(
+                    parish=cls.parish1,
+                    community=cls.community1,
+                    starts_at=timezone.now() + timedelta(days=1),
+                    status="scheduled",
+                ),
+                MassInstance(
+                    parish=cls.parish2,
+                    community=cls.community2,
+                    starts_at=timezone.now() + timedelta(days=2),
+                    status="scheduled",
+                ),
+            ]
         )
 
     def test_api_is_scoped_by_active_parish(self):
-        client = APIClient()
-        client.login(email="user@example.com", password="pass")
-        session = client.session
+        self.client.force_login(self.user)
+        session = self.client.session
         session["active_parish_id"] = self.parish1.id
         session.save()
-        response = client.get("/api/masses/")
+        response = self.client.get("/api/masses/")
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.json()), 1)
 
     def test_api_parish_header_scopes_results(self):
-        client = APIClient()
-        credentials = base64.b64encode(b"user@example.com:pass").decode("utf-8")
-        client.credentials(HTTP_AUTHORIZATION=f"Basic {credentials}", HTTP_X_PARISH_ID=str(self.parish1.id))
-        response = client.get("/api/masses/")
+        self.client.credentials(HTTP_AUTHORIZATION=self.basic_auth, HTTP_X_PARISH_ID=str(self.parish1.id))
+        response = self.client.get("/api/masses/")
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.json()), 1)
 
     def test_api_parish_header_blocks_other_parish(self):
-        client = APIClient()
-        credentials = base64.b64encode(b"user@example.com:pass").decode("utf-8")
-        client.credentials(HTTP_AUTHORIZATION=f"Basic {credentials}", HTTP_X_PARISH_ID=str(self.parish2.id))
-        response = client.get("/api/masses/")
+        self.client.credentials(HTTP_AUTHORIZATION=self.basic_auth, HTTP_X_PARISH_ID=str(self.parish2.id))
+        response = self.client.get("/api/masses/")
         self.assertEqual(response.status_code, 403)
 
     def test_api_requires_parish_header_when_missing(self):
-        client = APIClient()
-        credentials = base64.b64encode(b"user@example.com:pass").decode("utf-8")
-        client.credentials(HTTP_AUTHORIZATION=f"Basic {credentials}")
-        response = client.get("/api/masses/")
+        self.client.credentials(HTTP_AUTHORIZATION=self.basic_auth)
+        response = self.client.get("/api/masses/")
         self.assertEqual(response.status_code, 400)
         self.assertIn("X-Parish-ID", response.content.decode("utf-8"))
 
@@ -1,6 +1,7 @@
 from datetime import timedelta
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
 from django.utils import timezone
 
@@ -42,7 +43,11 @@ class PublishingTests(TestCase):
         )
         assignment = Assignment.objects.create(parish=parish, slot=slot, acolyte=acolyte, assignment_state="proposed")
 
-        published = publish_assignments(parish, instance.starts_at.date(), instance.starts_at.date(), actor=user)
+        publish_date = timezone.localdate(instance.starts_at)
+        # One extra SELECT ... FOR UPDATE per assignment where the backend supports row locks.
+        expected_queries = 14 + int(connection.features.has_select_for_update)
+        with self.assertNumQueries(expected_queries):
+            published = publish_assignments(parish, publish_date, publish_date, actor=user)
         self.assertEqual(published, 1)
 
         assignment.refresh_from_db()
@@ -75,8 +80,9 @@ class PublishingTests(TestCase):
         )
         assignment = Assignment.objects.create(parish=parish, slot=slot, acolyte=acolyte, assignment_state="proposed")
 
-        first = publish_assignments(parish, instance.starts_at.date(), instance.starts_at.date(), actor=user)
-        second = publish_assignments(parish, instance.starts_at.date(), instance.starts_at.date(), actor=user)
+        publish_date = timezone.localdate(instance.starts_at)
+        first = publish_assignments(parish, publish_date, publish_date, actor=user)
+        second = publish_assignments(parish, publish_date, publish_date, actor=user)
 
         assignment.refresh_from_db()
         self.assertEqual(first, 1)
@@ -1,24 +1,36 @@
 from datetime import timedelta
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
-from core.models import Community, EventSeries, MassInstance, Parish
-from core.services.recommendations import get_mass_context
+from core.models import (
+    AcolyteProfile,
+    AcolyteStats,
+    AssignmentSlot,
+    Community,
+    EventSeries,
+    MassInstance,
+    Parish,
+    PositionType,
+)
+from core.services.recommendations import build_recommendation_cache, get_mass_context, score_candidate
 
 
 class RecommendationContextTests(TestCase):
-    def setUp(self):
-        self.parish = Parish.objects.create(name="Parish")
-        self.community = Community.objects.create(parish=self.parish, code="MAT", name="Matriz")
+    @classmethod
+    def setUpTestData(cls):
+        cls.parish = Parish.objects.create(name="Parish")
+        cls.community = Community.objects.create(parish=cls.parish, code="MAT", name="Matriz")
         today = timezone.now().date()
-        self.series = EventSeries.objects.create(
-            parish=self.parish,
+        cls.series = EventSeries.objects.create(
+            parish=cls.parish,
             series_type="Novena",
             title="Serie",
             start_date=today,
             end_date=today,
-            default_community=self.community,
+            default_community=cls.community,
             candidate_pool="interested_only",
         )
 
@@ -77,3 +89,43 @@ class RecommendationContextTests(TestCase):
             now=instance.starts_at - timedelta(hours=20),
         )
         self.assertEqual(context["interest_deadline_at"], deadline)
+
+
+class ScoreCandidateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parish = Parish.objects.create(name="Parish")
+        community = Community.objects.create(parish=cls.parish, code="MAT", name="Matriz")
+        position = PositionType.objects.create(parish=cls.parish, code="LIB", name="Libriferario")
+        instance = MassInstance.objects.create(
+            parish=cls.parish,
+            community=community,
+            starts_at=timezone.now() + timedelta(days=3),
+            status="scheduled",
+        )
+        cls.slot = AssignmentSlot.objects.create(parish=cls.parish, mass_instance=instance, position_type=position)
+        cls.acolyte = AcolyteProfile.objects.create(
+            parish=cls.parish, display_name="Acolito", scheduling_mode="reserve"
+        )
+
+    def test_score_follows_replaced_weights(self):
+        cache = build_recommendation_cache(self.parish, slots=[self.slot])
+        context = get_mass_context(self.slot.mass_instance, cache["weights"], cache["interest_map"], cache["now"])
+        default_score = score_candidate(self.acolyte, self.slot, context, cache)
+        cache["weights"] = {"reserve_penalty": 10}
+        self.assertEqual(score_candidate(self.acolyte, self.slot, context, cache), default_score + 990)
+
+    def test_cache_reads_stats_joined_on_acolytes(self):
+        other = AcolyteProfile.objects.create(parish=self.parish, display_name="Outro")
+        AcolyteStats.objects.create(parish=self.parish, acolyte=other, reliability_score=80.0)
+
+        with CaptureQueriesContext(connection) as ctx:
+            cache = build_recommendation_cache(self.parish, slots=[self.slot])
+
+        stats_query = f'SELECT "{AcolyteStats._meta.db_table}"'
+        self.assertFalse([query for query in ctx.captured_queries if query["sql"].startswith(stats_query)])
+        self.assertEqual(list(cache["stats_map"]), [other.id])
+        self.assertEqual(cache["stats_map"][other.id].reliability_score, 80.0)
+
+        supplied = build_recommendation_cache(self.parish, slots=[self.slot], acolytes=[self.acolyte, other])
+        self.assertEqual(list(supplied["stats_map"]), [other.id])
@@ -15,74 +15,68 @@ from core.models import (
     ReplacementRequest,
 )
 from core.services.assignments import ConcurrentUpdateError
-from core.services.replacements import assign_replacement_request, create_replacement_request
+from core.services.replacements import (
+    assign_replacement,
+    assign_replacement_request,
+    create_replacement_request,
+)
 
 
 class ReplacementServiceTests(TestCase):
-    def test_assign_replacement_creates_new_assignment(self):
-        parish = Parish.objects.create(name="Parish")
-        community = Community.objects.create(parish=parish, code="MAT", name="Matriz")
-        position = PositionType.objects.create(parish=parish, code="LIB", name="Libriferario")
-        acolyte_a = AcolyteProfile.objects.create(parish=parish, display_name="Acolito A")
-        acolyte_b = AcolyteProfile.objects.create(parish=parish, display_name="Acolito B")
-        AcolyteQualification.objects.create(parish=parish, acolyte=acolyte_a, position_type=position, qualified=True)
-        AcolyteQualification.objects.create(parish=parish, acolyte=acolyte_b, position_type=position, qualified=True)
+    @classmethod
+    def setUpTestData(cls):
+        cls.parish = Parish.objects.create(name="Parish")
+        community = Community.objects.create(parish=cls.parish, code="MAT", name="Matriz")
+        position = PositionType.objects.create(parish=cls.parish, code="LIB", name="Libriferario")
+        cls.acolyte_a = AcolyteProfile.objects.create(parish=cls.parish, display_name="Acolito A")
+        cls.acolyte_b = AcolyteProfile.objects.create(parish=cls.parish, display_name="Acolito B")
+        AcolyteQualification.objects.bulk_create(
+            [
+                AcolyteQualification(parish=cls.parish, acolyte=cls.acolyte_a, position_type=position, qualified=True),
+                AcolyteQualification(parish=cls.parish, acolyte=cls.acolyte_b, position_type=position, qualified=True),
+            ]
+        )
 
         instance = MassInstance.objects.create(
-            parish=parish,
+            parish=cls.parish,
             community=community,
             starts_at=timezone.now() + timedelta(days=3),
             status="scheduled",
         )
-        slot = AssignmentSlot.objects.create(
-            parish=parish,
+        cls.slot = AssignmentSlot.objects.create(
+            parish=cls.parish,
             mass_instance=instance,
             position_type=position,
             slot_index=1,
             required=True,
             status="assigned",
         )
-        assignment = Assignment.objects.create(parish=parish, slot=slot, acolyte=acolyte_a)
+
+    def test_assign_replacement_creates_new_assignment(self):
+        parish = self.parish
+        slot = self.slot
+        assignment = Assignment.objects.create(parish=parish, slot=slot, acolyte=self.acolyte_a)
         replacement = create_replacement_request(parish, slot)
 
-        new_assignment = assign_replacement_request(parish, replacement.id, acolyte_b)
+        with self.assertNumQueries(25):
+            new_assignment = assign_replacement_request(parish, replacement.id, self.acolyte_b)
 
         assignment.refresh_from_db()
         slot.refresh_from_db()
         self.assertFalse(assignment.is_active)
         self.assertTrue(new_assignment.is_active)
-        self.assertEqual(new_assignment.acolyte_id, acolyte_b.id)
+        self.assertEqual(new_assignment.acolyte_id, self.acolyte_b.id)
         self.assertEqual(ReplacementRequest.objects.filter(parish=parish, slot=slot, status="assigned").count(), 1)
 
     def test_assign_replacement_request_is_exclusive(self):
-        parish = Parish.objects.create(name="Parish")
-        community = Community.objects.create(parish=parish, code="MAT", name="Matriz")
-        position = PositionType.objects.create(parish=parish, code="LIB", name="Libriferario")
-        acolyte_a = AcolyteProfile.objects.create(parish=parish, display_name="Acolito A")
-        acolyte_b = AcolyteProfile.objects.create(parish=parish, display_name="Acolito B")
-        AcolyteQualification.objects.create(parish=parish, acolyte=acolyte_a, position_type=position, qualified=True)
-        AcolyteQualification.objects.create(parish=parish, acolyte=acolyte_b, position_type=position, qualified=True)
-
-        instance = MassInstance.objects.create(
-            parish=parish,
-            community=community,
-            starts_at=timezone.now() + timedelta(days=3),
-            status="scheduled",
-        )
-        slot = AssignmentSlot.objects.create(
-            parish=parish,
-            mass_instance=instance,
-            position_type=position,
-            slot_index=1,
-            required=True,
-            status="assigned",
-        )
-        Assignment.objects.create(parish=parish, slot=slot, acolyte=acolyte_a)
+        parish = self.parish
+        slot = self.slot
+        Assignment.objects.create(parish=parish, slot=slot, acolyte=self.acolyte_a)
         replacement = create_replacement_request(parish, slot)
 
-        assign_replacement_request(parish, replacement.id, acolyte_b)
+        assign_replacement_request(parish, replacement.id, self.acolyte_b)
         with self.assertRaises(ConcurrentUpdateError):
-            assign_replacement_request(parish, replacement.id, acolyte_b)
+            assign_replacement_request(parish, replacement.id, self.acolyte_b)
 
         self.assertEqual(
             Assignment.objects.filter(parish=parish, slot=slot, is_active=True).count(),
@@ -90,30 +84,26 @@ class ReplacementServiceTests(TestCase):
         )
 
     def test_assign_replacement_rejects_foreign_parish(self):
-        parish = Parish.objects.create(name="Parish")
+        parish = self.parish
+        slot = self.slot
         other_parish = Parish.objects.create(name="Other")
-        community = Community.objects.create(parish=parish, code="MAT", name="Matriz")
-        position = PositionType.objects.create(parish=parish, code="LIB", name="Libriferario")
-        acolyte_a = AcolyteProfile.objects.create(parish=parish, display_name="Acolito A")
-        acolyte_b = AcolyteProfile.objects.create(parish=other_parish, display_name="Acolito B")
-        AcolyteQualification.objects.create(parish=parish, acolyte=acolyte_a, position_type=position, qualified=True)
-
-        instance = MassInstance.objects.create(
-            parish=parish,
-            community=community,
-            starts_at=timezone.now() + timedelta(days=3),
-            status="scheduled",
-        )
-        slot = AssignmentSlot.objects.create(
-            parish=parish,
-            mass_instance=instance,
-            position_type=position,
-            slot_index=1,
-            required=True,
-            status="assigned",
-        )
-        Assignment.objects.create(parish=parish, slot=slot, acolyte=acolyte_a)
+        foreign_acolyte = AcolyteProfile.objects.create(parish=other_parish, display_name="Acolito B")
+        Assignment.objects.create(parish=parish, slot=slot, acolyte=self.acolyte_a)
         replacement = create_replacement_request(parish, slot)
 
         with self.assertRaises(ValueError):
-            assign_replacement_request(parish, replacement.id, acolyte_b)
+            assign_replacement_request(parish, replacement.id, foreign_acolyte)
+
+    def test_assign_replacement_for_slot_marks_pending_request(self):
+        parish = self.parish
+        slot = self.slot
+        Assignment.objects.create(parish=parish, slot=slot, acolyte=self.acolyte_a)
+        replacement = create_replacement_request(parish, slot)
+
+        new_assignment = assign_replacement(parish, slot, self.acolyte_b)
+
+        replacement.refresh_from_db()
+        self.assertEqual(new_assignment.acolyte_id, self.acolyte_b.id)
+        self.assertEqual(new_assignment.assignment_state, "published")
+        self.assertEqual(replacement.status, "assigned")
+        self.assertEqual(Assignment.objects.filter(parish=parish, slot=slot, is_active=True).count(), 1)
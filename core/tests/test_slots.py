@@ -15,162 +15,61 @@ from core.services.slots import sync_slots_for_instance
 
 
 class SlotSyncTests(TestCase):
-    def test_sync_slots_creates_required_positions(self):
-        parish = Parish.objects.create(name="Parish")
-        community = Community.objects.create(parish=parish, code="MAT", name="Matriz")
-        position = PositionType.objects.create(parish=parish, code="LIB", name="Libriferario")
-        profile = RequirementProfile.objects.create(parish=parish, name="Dominical")
-        RequirementProfilePosition.objects.create(profile=profile, position_type=position, quantity=2)
-
-        instance = MassInstance.objects.create(
-            parish=parish,
-            community=community,
+    @classmethod
+    def setUpTestData(cls):
+        cls.parish = Parish.objects.create(name="Parish")
+        cls.community = Community.objects.create(parish=cls.parish, code="MAT", name="Matriz")
+        position = PositionType.objects.create(parish=cls.parish, code="LIB", name="Libriferario")
+        cls.profile_a = RequirementProfile.objects.create(parish=cls.parish, name="Dominical")
+        cls.profile_b = RequirementProfile.objects.create(parish=cls.parish, name="Simples")
+        RequirementProfilePosition.objects.create(profile=cls.profile_a, position_type=position, quantity=2)
+        RequirementProfilePosition.objects.create(profile=cls.profile_b, position_type=position, quantity=1)
+
+    def _create_instance(self, profile):
+        return MassInstance.objects.create(
+            parish=self.parish,
+            community=self.community,
             starts_at=timezone.now(),
             requirement_profile=profile,
             status="scheduled",
         )
 
-        created = sync_slots_for_instance(instance)
-        self.assertEqual(len(created), 2)
-        self.assertEqual(instance.slots.count(), 2)
-
-    def test_sync_slots_finalizes_removed_positions(self):
-        parish = Parish.objects.create(name="Parish")
-        community = Community.objects.create(parish=parish, code="MAT", name="Matriz")
-        position = PositionType.objects.create(parish=parish, code="LIB", name="Libriferario")
-        profile_a = RequirementProfile.objects.create(parish=parish, name="Dominical")
-        profile_b = RequirementProfile.objects.create(parish=parish, name="Simples")
-        RequirementProfilePosition.objects.create(profile=profile_a, position_type=position, quantity=2)
-        RequirementProfilePosition.objects.create(profile=profile_b, position_type=position, quantity=1)
-
-        instance = MassInstance.objects.create(
-            parish=parish,
-            community=community,
-            starts_at=timezone.now(),
-            requirement_profile=profile_a,
-            status="scheduled",
-        )
-
-        sync_slots_for_instance(instance)
-
-        instance.requirement_profile = profile_b
-        instance.save(update_fields=["requirement_profile", "updated_at"])
-        sync_slots_for_instance(instance)
-
-        removed_slot = instance.slots.get(slot_index=2)
-        self.assertFalse(removed_slot.required)
-        self.assertEqual(removed_slot.status, "finalized")
-
-    def test_sync_slots_handles_missing_profile(self):
-        parish = Parish.objects.create(name="Parish")
-        community = Community.objects.create(parish=parish, code="MAT", name="Matriz")
-        position = PositionType.objects.create(parish=parish, code="LIB", name="Libriferario")
-        profile = RequirementProfile.objects.create(parish=parish, name="Dominical")
-        RequirementProfilePosition.objects.create(profile=profile, position_type=position, quantity=1)
-
-        instance = MassInstance.objects.create(
-            parish=parish,
-            community=community,
-            starts_at=timezone.now(),
-            requirement_profile=profile,
-            status="scheduled",
-        )
-
-        sync_slots_for_instance(instance)
-
-        instance.requirement_profile = None
-        instance.save(update_fields=["requirement_profile", "updated_at"])
-        sync_slots_for_instance(instance)
-
-        slot = instance.slots.get(slot_index=1)
-        self.assertFalse(slot.required)
-        self.assertEqual(slot.status, "finalized")
-
-    def test_sync_slots_reactivates_slot_status(self):
-        parish = Parish.objects.create(name="Parish")
-        community = Community.objects.create(parish=parish, code="MAT", name="Matriz")
-        position = PositionType.objects.create(parish=parish, code="LIB", name="Libriferario")
-        profile_a = RequirementProfile.objects.create(parish=parish, name="Dominical")
-        profile_b = RequirementProfile.objects.create(parish=parish, name="Simples")
-        RequirementProfilePosition.objects.create(profile=profile_a, position_type=position, quantity=2)
-        RequirementProfilePosition.objects.create(profile=profile_b, position_type=position, quantity=1)
-
-        instance = MassInstance.objects.create(
-            parish=parish,
-            community=community,
-            starts_at=timezone.now(),
-            requirement_profile=profile_a,
-            status="scheduled",
-        )
-        sync_slots_for_instance(instance)
-
-        instance.requirement_profile = profile_b
-        instance.save(update_fields=["requirement_profile", "updated_at"])
-        sync_slots_for_instance(instance)
+    def test_sync_slots_profile_transitions(self):
+        acolyte = AcolyteProfile.objects.create(parish=self.parish, display_name="Acolito")
+        instance = self._create_instance(self.profile_a)
 
-        instance.requirement_profile = profile_a
-        instance.save(update_fields=["requirement_profile", "updated_at"])
-        sync_slots_for_instance(instance)
+        with self.assertNumQueries(4):
+            created = sync_slots_for_instance(instance)
+        with self.subTest("creates required positions"):
+            self.assertEqual(len(created), 2)
+            self.assertEqual(instance.slots.count(), 2)
 
-        slot = instance.slots.get(slot_index=2)
-        self.assertTrue(slot.required)
-        self.assertEqual(slot.status, "open")
-
-    def test_sync_slots_clears_external_coverage_on_removal(self):
-        parish = Parish.objects.create(name="Parish")
-        community = Community.objects.create(parish=parish, code="MAT", name="Matriz")
-        position = PositionType.objects.create(parish=parish, code="LIB", name="Libriferario")
-        profile_a = RequirementProfile.objects.create(parish=parish, name="Dominical")
-        profile_b = RequirementProfile.objects.create(parish=parish, name="Simples")
-        RequirementProfilePosition.objects.create(profile=profile_a, position_type=position, quantity=2)
-        RequirementProfilePosition.objects.create(profile=profile_b, position_type=position, quantity=1)
-
-        instance = MassInstance.objects.create(
-            parish=parish,
-            community=community,
-            starts_at=timezone.now(),
-            requirement_profile=profile_a,
-            status="scheduled",
-        )
-        sync_slots_for_instance(instance)
-
-        slot = instance.slots.get(slot_index=2)
+        slot = {slot.slot_index: slot for slot in created}[2]
         slot.externally_covered = True
         slot.external_coverage_notes = "Coberto"
         slot.save(update_fields=["externally_covered", "external_coverage_notes", "updated_at"])
-
-        instance.requirement_profile = profile_b
-        instance.save(update_fields=["requirement_profile", "updated_at"])
-        sync_slots_for_instance(instance)
-
-        slot.refresh_from_db()
-        self.assertFalse(slot.externally_covered)
-        self.assertEqual(slot.external_coverage_notes, "")
-
-    def test_sync_slots_deactivates_assignment_on_removal(self):
-        parish = Parish.objects.create(name="Parish")
-        community = Community.objects.create(parish=parish, code="MAT", name="Matriz")
-        position = PositionType.objects.create(parish=parish, code="LIB", name="Libriferario")
-        profile_a = RequirementProfile.objects.create(parish=parish, name="Dominical")
-        profile_b = RequirementProfile.objects.create(parish=parish, name="Simples")
-        RequirementProfilePosition.objects.create(profile=profile_a, position_type=position, quantity=2)
-        RequirementProfilePosition.objects.create(profile=profile_b, position_type=position, quantity=1)
-        acolyte = AcolyteProfile.objects.create(parish=parish, display_name="Acolito")
-
-        instance = MassInstance.objects.create(
-            parish=parish,
-            community=community,
-            starts_at=timezone.now(),
-            requirement_profile=profile_a,
-            status="scheduled",
-        )
-        sync_slots_for_instance(instance)
-        slot = instance.slots.get(slot_index=2)
-        assignment = Assignment.objects.create(parish=parish, slot=slot, acolyte=acolyte, assignment_state="published")
-
-        instance.requirement_profile = profile_b
-        instance.save(update_fields=["requirement_profile", "updated_at"])
-        sync_slots_for_instance(instance)
+        assignment = Assignment.objects.create(parish=self.parish, slot=slot, acolyte=acolyte, assignment_state="published")
+
+        # (step, new profile, queries, {slot_index: (required, status, externally_covered)})
+        transitions = [
+            ("finalizes removed positions", self.profile_b, 9, {1: (True, "open", False), 2: (False, "finalized", False)}),
+            ("reactivates slot status", self.profile_a, 4, {1: (True, "open", False), 2: (True, "open", False)}),
+            ("handles missing profile", None, 3, {1: (False, "finalized", False), 2: (False, "finalized", False)}),
+        ]
+        for step, profile, queries, expected in transitions:
+            MassInstance.objects.filter(pk=instance.pk).update(requirement_profile=profile, updated_at=timezone.now())
+            instance.requirement_profile = profile
+            with self.assertNumQueries(queries):
+                sync_slots_for_instance(instance)
+            slots = {slot.slot_index: slot for slot in instance.slots.all()}
+            with self.subTest(step):
+                for slot_index, (required, status, externally_covered) in expected.items():
+                    slot = slots[slot_index]
+                    self.assertEqual(slot.required, required)
+                    self.assertEqual(slot.status, status)
+                    self.assertEqual(slot.externally_covered, externally_covered)
+                    if not externally_covered:
+                        self.assertEqual(slot.external_coverage_notes, "")
 
         assignment.refresh_from_db()
         self.assertFalse(assignment.is_active)
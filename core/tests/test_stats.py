@@ -19,109 +19,64 @@ from core.services.stats import recompute_stats
 
 
 class StatsRecomputeTests(TestCase):
-    def test_recompute_stats_scopes_by_parish(self):
-        parish_a = Parish.objects.create(name="Parish A")
-        parish_b = Parish.objects.create(name="Parish B")
-        community_a = Community.objects.create(parish=parish_a, code="MAT", name="Matriz")
-        community_b = Community.objects.create(parish=parish_b, code="STM", name="Comunidade")
-        position_a = PositionType.objects.create(parish=parish_a, code="LIB", name="Libriferario")
-        position_b = PositionType.objects.create(parish=parish_b, code="LIB", name="Libriferario")
-        acolyte_a = AcolyteProfile.objects.create(parish=parish_a, display_name="Acolito A")
-        acolyte_b = AcolyteProfile.objects.create(parish=parish_b, display_name="Acolito B")
+    @classmethod
+    def setUpTestData(cls):
+        cls.parish_a = Parish.objects.create(name="Parish A")
+        cls.parish_b = Parish.objects.create(name="Parish B")
+        cls.community_a = Community.objects.create(parish=cls.parish_a, code="MAT", name="Matriz")
+        cls.community_b = Community.objects.create(parish=cls.parish_b, code="STM", name="Comunidade")
+        cls.position_a = PositionType.objects.create(parish=cls.parish_a, code="LIB", name="Libriferario")
+        cls.position_b = PositionType.objects.create(parish=cls.parish_b, code="LIB", name="Libriferario")
+        cls.acolyte_a = AcolyteProfile.objects.create(parish=cls.parish_a, display_name="Acolito A")
+        cls.acolyte_b = AcolyteProfile.objects.create(parish=cls.parish_b, display_name="Acolito B")
+        AcolyteProfile.objects.create(parish=cls.parish_a, display_name="Acolito C")
 
-        instance_a = MassInstance.objects.create(
-            parish=parish_a,
-            community=community_a,
-            starts_at=timezone.now() - timedelta(days=1),
-            status="scheduled",
-        )
-        slot_a = AssignmentSlot.objects.create(
-            parish=parish_a,
-            mass_instance=instance_a,
-            position_type=position_a,
-            slot_index=1,
-            required=True,
-            status="assigned",
-        )
-        assignment_a = Assignment.objects.create(
-            parish=parish_a,
-            slot=slot_a,
-            acolyte=acolyte_a,
-            assignment_state="published",
-        )
-        Confirmation.objects.create(parish=parish_a, assignment=assignment_a, status="confirmed")
+        starts_at = timezone.now() - timedelta(days=1)
+        for parish, community, position, acolyte, confirmation_status, delta in (
+            (cls.parish_a, cls.community_a, cls.position_a, cls.acolyte_a, "confirmed", 5),
+            (cls.parish_b, cls.community_b, cls.position_b, cls.acolyte_b, "declined", 100),
+        ):
+            instance = MassInstance.objects.create(
+                parish=parish,
+                community=community,
+                starts_at=starts_at,
+                status="scheduled",
+            )
+            slot = AssignmentSlot.objects.create(
+                parish=parish,
+                mass_instance=instance,
+                position_type=position,
+                slot_index=1,
+                required=True,
+                status="assigned",
+            )
+            assignment = Assignment.objects.create(
+                parish=parish,
+                slot=slot,
+                acolyte=acolyte,
+                assignment_state="published",
+            )
+            Confirmation.objects.create(parish=parish, assignment=assignment, status=confirmation_status)
+            AcolyteCreditLedger.objects.create(
+                parish=parish,
+                acolyte=acolyte,
+                delta=delta,
+                reason_code="served_unpopular_slot",
+            )
 
-        instance_b = MassInstance.objects.create(
-            parish=parish_b,
-            community=community_b,
-            starts_at=timezone.now() - timedelta(days=1),
-            status="scheduled",
+        recompute_stats(cls.parish_a)
+        cls.stats = AcolyteStats.objects.select_related("acolyte", "parish").get(
+            parish=cls.parish_a, acolyte=cls.acolyte_a
         )
-        slot_b = AssignmentSlot.objects.create(
-            parish=parish_b,
-            mass_instance=instance_b,
-            position_type=position_b,
-            slot_index=1,
-            required=True,
-            status="assigned",
-        )
-        assignment_b = Assignment.objects.create(
-            parish=parish_b,
-            slot=slot_b,
-            acolyte=acolyte_b,
-            assignment_state="published",
-        )
-        Confirmation.objects.create(parish=parish_b, assignment=assignment_b, status="declined")
 
-        recompute_stats(parish_a)
-
-        stats = AcolyteStats.objects.get(parish=parish_a, acolyte=acolyte_a)
-        self.assertEqual(stats.confirmation_rate, 1.0)
-        self.assertEqual(stats.cancellations_rate, 0.0)
+    def test_recompute_stats_scopes_by_parish(self):
+        self.assertEqual(self.stats.confirmation_rate, 1.0)
+        self.assertEqual(self.stats.cancellations_rate, 0.0)
+        self.assertFalse(AcolyteStats.objects.filter(parish=self.parish_b).exists())
 
     def test_credit_balance_scopes_by_parish(self):
-        parish_a = Parish.objects.create(name="Parish A")
-        parish_b = Parish.objects.create(name="Parish B")
-        community_a = Community.objects.create(parish=parish_a, code="MAT", name="Matriz")
-        position_a = PositionType.objects.create(parish=parish_a, code="LIB", name="Libriferario")
-        acolyte_a = AcolyteProfile.objects.create(parish=parish_a, display_name="Acolito A")
-        acolyte_b = AcolyteProfile.objects.create(parish=parish_b, display_name="Acolito B")
-
-        instance_a = MassInstance.objects.create(
-            parish=parish_a,
-            community=community_a,
-            starts_at=timezone.now() - timedelta(days=1),
-            status="scheduled",
-        )
-        slot_a = AssignmentSlot.objects.create(
-            parish=parish_a,
-            mass_instance=instance_a,
-            position_type=position_a,
-            slot_index=1,
-            required=True,
-            status="assigned",
-        )
-        Assignment.objects.create(
-            parish=parish_a,
-            slot=slot_a,
-            acolyte=acolyte_a,
-            assignment_state="published",
-        )
-
-        AcolyteCreditLedger.objects.create(
-            parish=parish_a,
-            acolyte=acolyte_a,
-            delta=5,
-            reason_code="served_unpopular_slot",
-        )
-        AcolyteCreditLedger.objects.create(
-            parish=parish_b,
-            acolyte=acolyte_b,
-            delta=100,
-            reason_code="served_unpopular_slot",
-        )
-
-        recompute_stats(parish_a)
+        self.assertEqual(self.stats.credit_balance, 5)
 
-        stats = AcolyteStats.objects.get(parish=parish_a, acolyte=acolyte_a)
-        self.assertEqual(stats.credit_balance, 5)
+    def test_recompute_stats_query_budget(self):
+        with self.assertNumQueries(6):
+            recompute_stats(self.parish_a)
@@ -3,14 +3,21 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "acoli.settings")
 import django
 django.setup()
 
-from core.models import MassInstance, Community
-c = Community.objects.get(code='NSL')
-mi = MassInstance.objects.filter(parish__isnull=False, community=c, starts_at__date='2026-02-08', starts_at__hour=8, starts_at__minute=15)
-print('Found:', mi.count(), 'instances')
-if mi.exists():
-    m = mi.first()
-    print('ID:', m.id, 'Status:', m.status)
-    m.delete()
-    print('Deleted')
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from core.models import MassInstance
+start = timezone.make_aware(datetime(2026, 2, 8, 8, 15))
+mi = MassInstance.objects.filter(
+    parish__isnull=False, community__code='NSL', starts_at__gte=start, starts_at__lt=start + timedelta(minutes=1)
+)
+found = list(mi.values_list('id', 'status'))
+print('Found:', len(found), 'instances')
+for mass_id, status in found:
+    print('ID:', mass_id, 'Status:', status)
+if found:
+    deleted, _ = MassInstance.objects.filter(id__in=[mass_id for mass_id, _ in found]).delete()
+    print('Deleted', deleted, 'rows (including cascades)')
 else:
-    print('No instance found')
\ No newline at end of file
+    print('No instance found')
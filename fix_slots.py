@@ -3,14 +3,16 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "acoli.settings")
 import django
 django.setup()
 
-from core.models import AssignmentSlot
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from core.models import Assignment, AssignmentSlot
 
 # Fix slot statuses
-slots = AssignmentSlot.objects.filter(required=True, status='assigned')
-for slot in slots:
-    if not slot.active_assignment:
-        slot.status = 'open'
-        slot.save()
-        print(f"Fixed slot {slot.id} status to 'open'")
+active = Assignment.objects.filter(slot=OuterRef('pk'), is_active=True)
+fixed = AssignmentSlot.objects.filter(required=True, status='assigned').filter(~Exists(active)).update(
+    status='open', updated_at=timezone.now()
+)
+print(f"Fixed {fixed} slot(s) status to 'open'")
 
-print("Slot statuses fixed.")
\ No newline at end of file
+print("Slot statuses fixed.")
@@ -1,16 +1,16 @@
-import multiprocessing
 import os
-from pathlib import Path
-from dotenv import load_dotenv
 
-BASE_DIR = Path(__file__).resolve().parent
-
-env_path = BASE_DIR / ".env"
-if env_path.exists():
-    load_dotenv(env_path)
-
-workers = 2
-threads = 4
+worker_class = "gthread"
+# Heroku sets WEB_CONCURRENCY per dyno size; cpu_count() there reports the host's cores.
+workers = int(os.environ.get("GUNICORN_WORKERS") or os.environ.get("WEB_CONCURRENCY") or 2)
+threads = int(os.environ.get("GUNICORN_THREADS") or 4)
+preload_app = True
 max_requests = 1000
 max_requests_jitter = 50
 
+
+def post_fork(server, worker):
+    # With preload_app, never let workers reuse a connection opened in the master.
+    from django.db import connections
+
+    connections.close_all()
@@ -20,6 +20,7 @@ import django
 django.setup()
 from django.conf import settings
 from django.db import transaction, connection, models
+from django.db.models.functions import Cast
 from django.utils import timezone
 from django.core import serializers
 from django.apps import apps
@@ -45,10 +46,39 @@ def make_backup_dir():
     path.mkdir(parents=True, exist_ok=False)
     return path
 def serialize_qs(qs, path):
-    # writes JSON list of objects (Django serializers) preserving PK
-    data = serializers.serialize("json", qs, use_natural_primary_keys=False)
-    path.write_text(data, encoding="utf-8")
-    return path
+    # writes one object per line (Django "jsonl" serializer) preserving PK, streaming rows from the DB;
+    # returns the number of rows written
+    count = 0
+    def rows():
+        nonlocal count
+        for obj in qs.iterator(chunk_size=500):
+            count += 1
+            yield obj
+    with path.open("w", encoding="utf-8") as stream:
+        serializers.serialize("jsonl", rows(), stream=stream, use_natural_primary_keys=False)
+    return count
+# Largest tables: on Postgres they are dumped with COPY, which writes CSV server-side
+# instead of going through Django's Python serializer.
+COPY_BACKUP_MODELS = {AuditEvent, AcolyteCreditLedger}
+def copy_backup(qs, path):
+    # COPY (SELECT ...) TO STDOUT as CSV with header; returns the number of rows written
+    sql, params = qs.query.sql_with_params()
+    with connection.cursor() as cur, path.open("wb") as stream:
+        with cur.copy(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER)", params) as copy:
+            for data in copy:
+                stream.write(data)
+        return cur.rowcount
+def copy_restore(model, path):
+    # COPY ... FROM STDIN using the column list recorded in the CSV header; returns rows inserted
+    with path.open("rb") as stream:
+        columns = ", ".join(connection.ops.quote_name(col) for col in stream.readline().decode("utf-8").strip().split(","))
+        stream.seek(0)
+        table = connection.ops.quote_name(model._meta.db_table)
+        with connection.cursor() as cur:
+            with cur.copy(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, HEADER)") as copy:
+                while data := stream.read(1 << 20):
+                    copy.write(data)
+            return cur.rowcount
 def load_json_file(path):
     return json.loads(path.read_text(encoding="utf-8"))
 def detect_db_vendor():
@@ -72,6 +102,13 @@ def adjust_postgres_sequences(backup_meta):
                 maxid = cur.fetchone()[0]
                 cur.execute(f"SELECT setval('{seq}', %s, true)", [maxid])
     return
+def acquire_run_lock():
+    # session-level advisory lock: held until this process's DB connection closes
+    if detect_db_vendor() != "postgresql":
+        return True
+    with connection.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock(hashtext(%s))", ["acoli_limpar"])
+        return cur.fetchone()[0]
 def confirm_prompt(msg):
     resp = input(msg + " [type YES to proceed]: ")
     return resp.strip() == "YES"
@@ -87,63 +124,64 @@ def dry_run_report():
     future_assignments = Assignment.objects.filter(slot__in=future_slots, is_active=True)
     print(future_assignments.count())
     # counts of dependent objects for info
-    past_mass_ids = list(past_masses_qs.values_list("id", flat=True)[:1000])
-    # estimations for audit events referencing these entities:
-    audit_past = AuditEvent.objects.filter(entity_type="MassInstance", entity_id__in=[str(i) for i in past_mass_ids]).count()
-    print("AuditEvents referencing past MassInstance (sample count):", audit_past)
+    past_mass_ids = past_masses_qs.annotate(str_id=Cast("id", models.CharField(max_length=100))).values("str_id")
+    audit_past = AuditEvent.objects.filter(entity_type="MassInstance", entity_id__in=past_mass_ids).count()
+    print("AuditEvents referencing past MassInstance:", audit_past)
     print("Summary: will backup then delete all past MassInstance and related cascaded rows.")
     print("And will delete Assignment/Confirmation/AcolyteCreditLedger/AuditEvent related to future assignments.")
     return
 def collect_and_backup(backup_dir):
     tznow = timezone.now().astimezone(TIMEZONE)
     cutoff_dt = datetime.datetime.combine(CUTOFF_DATE, datetime.time.min).astimezone(TIMEZONE)
-    # Querysets
+    # Querysets (ids are passed as subqueries, never materialized in Python)
     past_masses_qs = MassInstance.objects.filter(starts_at__lt=cutoff_dt)
-    past_mass_ids = list(past_masses_qs.values_list("id", flat=True))
+    past_mass_ids = past_masses_qs.values("id")
     future_masses_qs = MassInstance.objects.filter(starts_at__gte=cutoff_dt)
     # Slots linked to past masses (but these will be deleted by cascade when mass deleted)
     past_slots_qs = AssignmentSlot.objects.filter(mass_instance__in=past_mass_ids)
-    past_slot_ids = list(past_slots_qs.values_list("id", flat=True))
+    past_slot_ids = past_slots_qs.values("id")
     # Assignments linked to past slots (also cascade)
     past_assignments_qs = Assignment.objects.filter(slot__in=past_slot_ids)
-    past_assignment_ids = list(past_assignments_qs.values_list("id", flat=True))
+    past_assignment_ids = past_assignments_qs.values("id")
     # Future slots + assignments to clean
-    future_slot_qs = AssignmentSlot.objects.filter(mass_instance__in=future_masses_qs)
-    future_slot_ids = list(future_slot_qs.values_list("id", flat=True))
+    future_slot_qs = AssignmentSlot.objects.filter(mass_instance__in=future_masses_qs.values("id"))
+    future_slot_ids = future_slot_qs.values("id")
     future_assignments_qs = Assignment.objects.filter(slot__in=future_slot_ids)
-    future_assignment_ids = list(future_assignments_qs.values_list("id", flat=True))
+    future_assignment_ids = future_assignments_qs.values("id")
     # Dependent objects we want to backup (both past cascaded rows and future assignments specifics)
-    confirmations_qs = Confirmation.objects.filter(assignment__in=past_assignment_ids + future_assignment_ids)
-    claims_qs = PositionClaimRequest.objects.filter(slot__in=past_slot_ids + future_slot_ids)
-    replacement_qs = ReplacementRequest.objects.filter(slot__in=past_slot_ids + future_slot_ids)
+    confirmations_qs = Confirmation.objects.filter(
+        models.Q(assignment__in=past_assignment_ids) | models.Q(assignment__in=future_assignment_ids)
+    )
+    claims_qs = PositionClaimRequest.objects.filter(
+        models.Q(slot__in=past_slot_ids) | models.Q(slot__in=future_slot_ids)
+    )
+    replacement_qs = ReplacementRequest.objects.filter(
+        models.Q(slot__in=past_slot_ids) | models.Q(slot__in=future_slot_ids)
+    )
     swap_qs = SwapRequest.objects.filter(mass_instance__in=past_mass_ids)
     massinterest_qs = MassInterest.objects.filter(mass_instance__in=past_mass_ids)
     massoverride_qs = MassOverride.objects.filter(instance__in=past_mass_ids)
-    ledger_qs = AcolyteCreditLedger.objects.filter(related_assignment__in=past_assignment_ids + future_assignment_ids)
+    ledger_qs = AcolyteCreditLedger.objects.filter(
+        models.Q(related_assignment__in=past_assignment_ids) | models.Q(related_assignment__in=future_assignment_ids)
+    )
+
+    # AuditEvent.entity_id is text, so ids are cast server-side to match it
+    def str_ids(qs):
+        return qs.annotate(str_id=Cast("id", models.CharField(max_length=100))).values("str_id")
+
     audit_qs = AuditEvent.objects.filter(
-        models.Q(entity_type="MassInstance", entity_id__in=[str(i) for i in past_mass_ids]) |
-        models.Q(entity_type="Assignment", entity_id__in=[str(i) for i in past_assignment_ids + future_assignment_ids]) |
-        models.Q(entity_type="AssignmentSlot", entity_id__in=[str(i) for i in past_slot_ids + future_slot_ids])
+        models.Q(entity_type="MassInstance", entity_id__in=str_ids(past_masses_qs)) |
+        models.Q(entity_type="Assignment", entity_id__in=str_ids(past_assignments_qs)) |
+        models.Q(entity_type="Assignment", entity_id__in=str_ids(future_assignments_qs)) |
+        models.Q(entity_type="AssignmentSlot", entity_id__in=str_ids(past_slots_qs)) |
+        models.Q(entity_type="AssignmentSlot", entity_id__in=str_ids(future_slot_qs))
     )
     # For safety, also backup any ReplacementRequest referencing future/past slots
     # Build metadata
     meta = {
         "created_at": tznow.isoformat(),
         "cutoff_date": CUTOFF_DATE.isoformat(),
-        "counts": {
-            "past_masses": past_masses_qs.count(),
-            "past_slots": past_slots_qs.count(),
-            "past_assignments": past_assignments_qs.count(),
-            "future_assignments_total": future_assignments_qs.count(),
-            "confirmations": confirmations_qs.count(),
-            "claims": claims_qs.count(),
-            "replacement_requests": replacement_qs.count(),
-            "swap_requests": swap_qs.count(),
-            "mass_interest": massinterest_qs.count(),
-            "mass_override": massoverride_qs.count(),
-            "ledger_rows": ledger_qs.count(),
-            "audit_events": audit_qs.count(),
-        },
+        "counts": {},  # filled in by dump() from the rows actually written
         "models_included": [
             "core.MassInstance",
             "core.AssignmentSlot",
@@ -171,23 +209,31 @@ def collect_and_backup(backup_dir):
     # Note: we backup future assignment rows (assignments + confirmations) to allow undo for cleaning future slots.
     serializers_dir = backup_dir / "serializers"
     serializers_dir.mkdir()
-    def dump(qs, name):
-        path = serializers_dir / f"{name}.json"
-        print("Backing up:", name, "->", path, "count=", qs.count())
-        serialize_qs(qs, path)
+    use_copy = detect_db_vendor() == "postgresql"
+    def dump(qs, name, count_key):
+        if use_copy and qs.model in COPY_BACKUP_MODELS:
+            path = serializers_dir / f"{name}.csv"
+            print("Backing up:", name, "->", path)
+            count = copy_backup(qs, path)
+        else:
+            path = serializers_dir / f"{name}.jsonl"
+            print("Backing up:", name, "->", path)
+            count = serialize_qs(qs, path)
+        print("  count=", count)
+        meta["counts"][count_key] = count
         return path
-    dump(past_masses_qs, "past_massinstance")
-    dump(past_slots_qs, "past_assignmentslot")
-    dump(past_assignments_qs, "past_assignment")
-    dump(future_assignments_qs, "future_assignment_active")
-    dump(confirmations_qs, "confirmation")
-    dump(replacement_qs, "replacementrequest")
-    dump(swap_qs, "swaprequest")
-    dump(massinterest_qs, "massinterest")
-    dump(massoverride_qs, "massoverride")
-    dump(claims_qs, "positionclaimrequest")
-    dump(ledger_qs, "acolytecreditledger")
-    dump(audit_qs, "auditevent")
+    dump(past_masses_qs, "past_massinstance", "past_masses")
+    dump(past_slots_qs, "past_assignmentslot", "past_slots")
+    dump(past_assignments_qs, "past_assignment", "past_assignments")
+    dump(future_assignments_qs, "future_assignment_active", "future_assignments_total")
+    dump(confirmations_qs, "confirmation", "confirmations")
+    dump(replacement_qs, "replacementrequest", "replacement_requests")
+    dump(swap_qs, "swaprequest", "swap_requests")
+    dump(massinterest_qs, "massinterest", "mass_interest")
+    dump(massoverride_qs, "massoverride", "mass_override")
+    dump(claims_qs, "positionclaimrequest", "claims")
+    dump(ledger_qs, "acolytecreditledger", "ledger_rows")
+    dump(audit_qs, "auditevent", "audit_events")
     # Write metadata
     meta_path = backup_dir / "meta.json"
     meta_path.write_text(json.dumps(meta, indent=2, default=str), encoding="utf-8")
@@ -196,29 +242,16 @@ def collect_and_backup(backup_dir):
 def apply_changes(backup_dir):
     tznow = timezone.now().astimezone(TIMEZONE)
     cutoff_dt = datetime.datetime.combine(CUTOFF_DATE, datetime.time.min).astimezone(TIMEZONE)
-    # 1) Delete past MassInstance in batches
-    print("Deleting past MassInstance rows in batches...")
-    batch = 500
-    while True:
-        with transaction.atomic():
-            ids = list(MassInstance.objects.filter(starts_at__lt=cutoff_dt).order_by("id").values_list("id", flat=True)[:batch])
-            if not ids:
-                break
-            print("Deleting batch of MassInstance ids:", ids[:5], "..." if len(ids)>5 else "")
-            MassInstance.objects.filter(id__in=ids).delete()
-    print("Past MassInstance rows deleted.")
+    # 1) Delete past MassInstance (one collector pass; cascades are emulated by Django, not the DB)
+    print("Deleting past MassInstance rows...")
+    with transaction.atomic():
+        deleted, per_model = MassInstance.objects.filter(starts_at__lt=cutoff_dt).delete()
+    print("Past MassInstance rows deleted:", deleted, per_model)
     # 2) For future masses: delete assignments linked to their slots (hard delete)
     print("Cleaning assignments for future mass instances (deleting Assignment rows)...")
-    future_slot_qs = AssignmentSlot.objects.filter(mass_instance__starts_at__gte=cutoff_dt)
-    batch = 1000
-    while True:
-        with transaction.atomic():
-            assign_ids = list(Assignment.objects.filter(slot__in=future_slot_qs).order_by("id").values_list("id", flat=True)[:batch])
-            if not assign_ids:
-                break
-            print("Deleting batch of Assignment ids:", assign_ids[:5], "..." if len(assign_ids)>5 else "")
-            Assignment.objects.filter(id__in=assign_ids).delete()
-    print("Future assignments deleted (confirmations and CASCADE rows removed).")
+    with transaction.atomic():
+        deleted, per_model = Assignment.objects.filter(slot__mass_instance__starts_at__gte=cutoff_dt).delete()
+    print("Future assignments deleted (confirmations and CASCADE rows removed):", deleted, per_model)
     # 3) Remove AcolyteCreditLedger rows that referenced the deleted assignments (we backuped)
     print("Deleting AcolyteCreditLedger rows where related_assignment is NULL-safe handled (we deleted related assignments).")
     # if any ledgers remain whose related_assignment is NULL and you prefer deletion, optionally delete them:
@@ -232,36 +265,49 @@ def restore_from_backup(backup_dir):
         raise RuntimeError("backup meta not found in " + str(backup_dir))
     meta = json.loads(meta_path.read_text(encoding="utf-8"))
     # Helper to load serialized objects (Django serializers) and bulk_create them reusing PKs
-    def load_and_create(model, filename):
-        path = serializers_dir / filename
-        if not path.exists():
-            print("No backup for", filename, "- skipping.")
+    # .csv files come from Postgres COPY; backups older than the JSONL format were written as a single JSON list
+    def load_and_create(model, name):
+        for fmt in ("csv", "jsonl", "json"):
+            path = serializers_dir / f"{name}.{fmt}"
+            if path.exists():
+                break
+        else:
+            print("No backup for", name, "- skipping.")
             return 0
-        objs = list(serializers.deserialize("json", path.read_text(encoding="utf-8")))
+        if fmt == "csv":
+            with transaction.atomic():
+                created = copy_restore(model, path)
+            print(f"Restored {created} rows for {path.name}")
+            return created
+        # JSONL is read line by line and inserted 1000 rows at a time; objects keep their original PK
         created = 0
-        with transaction.atomic():
-            for item in objs:
-                obj = item.object
-                obj.save(force_insert=True)  # force_insert to use original PK
-                created += 1
-        print(f"Restored {created} rows for {filename}")
+        batch = []
+        with transaction.atomic(), path.open(encoding="utf-8") as stream:
+            for item in serializers.deserialize(fmt, stream):
+                batch.append(item.object)
+                if len(batch) == 1000:
+                    created += len(model.objects.bulk_create(batch))
+                    batch = []
+            if batch:
+                created += len(model.objects.bulk_create(batch))
+        print(f"Restored {created} rows for {path.name}")
         return created
     # Restore in dependency order reversed of deletion:
     # 1) MassInstance and related -> BUT since some models have FK to massinstance, restore massinstance first
     # NOTE: we restored MassInstance, then slots, then assignments, confirmations, claims, replacements, swaps, ledger, audit
-    load_and_create(MassInstance, "past_massinstance.json")
-    load_and_create(AssignmentSlot, "past_assignmentslot.json")
-    load_and_create(Assignment, "past_assignment.json")
-    load_and_create("core.Assignment", "future_assignment_active.json")  # future assignments to restore
+    load_and_create(MassInstance, "past_massinstance")
+    load_and_create(AssignmentSlot, "past_assignmentslot")
+    load_and_create(Assignment, "past_assignment")
+    load_and_create(Assignment, "future_assignment_active")  # future assignments to restore
     # confirmations
-    load_and_create(Confirmation, "confirmation.json")
-    load_and_create(ReplacementRequest, "replacementrequest.json")
-    load_and_create(SwapRequest, "swaprequest.json")
-    load_and_create(MassInterest, "massinterest.json")
-    load_and_create(MassOverride, "massoverride.json")
-    load_and_create(PositionClaimRequest, "positionclaimrequest.json")
-    load_and_create(AcolyteCreditLedger, "acolytecreditledger.json")
-    load_and_create(AuditEvent, "auditevent.json")
+    load_and_create(Confirmation, "confirmation")
+    load_and_create(ReplacementRequest, "replacementrequest")
+    load_and_create(SwapRequest, "swaprequest")
+    load_and_create(MassInterest, "massinterest")
+    load_and_create(MassOverride, "massoverride")
+    load_and_create(PositionClaimRequest, "positionclaimrequest")
+    load_and_create(AcolyteCreditLedger, "acolytecreditledger")
+    load_and_create(AuditEvent, "auditevent")
     # Adjust sequences if Postgres
     adjust_postgres_sequences({"models_restored": meta.get("models_included", [])})
     print("Restore complete. Please validate counts and integrity.")
@@ -279,6 +325,9 @@ def main():
     if args.dry_run:
         dry_run_report()
         return
+    if not acquire_run_lock():
+        print("Outra execução do limpar.py está em andamento. Abortando.")
+        sys.exit(1)
     if args.undo:
         latest = find_latest_backup()
         if not latest:
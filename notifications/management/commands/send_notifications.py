@@ -1,13 +1,26 @@
 from django.core.management.base import BaseCommand
 
-from notifications.services import NotificationService
+from notifications.services import CLAIM_BATCH_SIZE, NotificationService
 
 
 class Command(BaseCommand):
     help = "Send pending notifications (email/whatsapp)."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=10,
+            help=f"Maximum batches of {CLAIM_BATCH_SIZE} notifications to send in this run.",
+        )
+
     def handle(self, *args, **options):
         service = NotificationService()
-        service.send_pending()
-        self.stdout.write(self.style.SUCCESS("Notifications processed"))
-
+        total = 0
+        for _ in range(options["max_batches"]):
+            processed = service.send_pending()
+            total += processed
+            # A short batch means the queue is drained or the relay was failing.
+            if processed < CLAIM_BATCH_SIZE:
+                break
+        self.stdout.write(self.style.SUCCESS(f"Notifications processed: {total}"))
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.7 on 2026-10-17 01:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_massinstance_core_massin_communi_61a5dd_idx'),
+        ('notifications', '0004_push_subscription'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['status', 'created_at'], name='notif_status_created_idx'),
+        ),
+    ]
@@ -41,6 +41,18 @@ class Notification(models.Model):
 
     class Meta:
         unique_together = ("channel", "idempotency_key")
+        indexes = [
+            models.Index(
+                fields=["status", "created_at"],
+                name="notif_status_created_idx",
+                condition=models.Q(status="pending"),
+            ),
+            models.Index(
+                fields=["status", "last_attempt_at"],
+                name="notif_processing_attempt_idx",
+                condition=models.Q(status="processing"),
+            ),
+        ]
 
 
 class PushSubscription(models.Model):
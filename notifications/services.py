@@ -1,5 +1,8 @@
+from collections import defaultdict
+
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import get_connection, send_mail
+from django.db import connection
 from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
@@ -8,6 +11,18 @@ from core.models import Assignment, AssignmentSlot, PositionClaimRequest, SwapRe
 from notifications.models import Notification, NotificationPreference
 
 
+CLAIM_BATCH_SIZE = 100
+MESSAGES_PER_CONNECTION = 100
+ABORT_MIN_BATCH = 30
+CLAIM_PENDING_SQL = """
+    UPDATE {table} SET status = 'processing', last_attempt_at = %s
+    WHERE id IN (
+        SELECT id FROM {table} WHERE status = 'pending' ORDER BY created_at LIMIT %s FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id
+"""
+
+
 class WhatsAppProvider:
     def send(self, notification):
         return True
@@ -16,6 +31,7 @@ class WhatsAppProvider:
 class NotificationService:
     def __init__(self):
         self.whatsapp_provider = WhatsAppProvider()
+        self.email_connection = None
 
     def reclaim_stuck(self, now=None, timeout_minutes=10):
         now = now or timezone.now()
@@ -26,9 +42,15 @@ class NotificationService:
             last_attempt_at=None,
         )
 
-    def claim_pending_ids(self, limit=100, now=None):
+    def claim_pending_ids(self, limit=CLAIM_BATCH_SIZE, now=None):
         now = now or timezone.now()
         self.reclaim_stuck(now=now)
+        if connection.vendor == "postgresql":
+            # One UPDATE ... RETURNING; rows locked by another worker's claim are skipped rather than waited on.
+            table = connection.ops.quote_name(Notification._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(CLAIM_PENDING_SQL.format(table=table), [now, limit])
+                return [row[0] for row in cursor.fetchall()]
         pending_ids = list(
             Notification.objects.filter(status="pending")
             .order_by("created_at")
@@ -50,34 +72,152 @@ class NotificationService:
         if notification.channel == "email":
             subject = notification.payload.get("subject", "Acoli notification")
             body = notification.payload.get("body", "")
-            send_mail(subject, body, settings.DEFAULT_FROM_EMAIL, [notification.user.email])
+            send_mail(
+                subject,
+                body,
+                settings.DEFAULT_FROM_EMAIL,
+                [notification.user.email],
+                connection=self.email_connection,
+            )
             return True
         if notification.channel == "whatsapp":
             return self.whatsapp_provider.send(notification)
         return False
 
-    def send_pending(self):
-        claimed_ids = self.claim_pending_ids()
+    def _open_email_connection(self, notifications):
+        if not any(notification.channel == "email" for notification in notifications):
+            return None
+        mail_connection = get_connection()
+        try:
+            mail_connection.open()
+        except Exception:
+            # Each send_mail then opens its own connection and records its own error.
+            return None
+        return mail_connection
+
+    def send_pending(self, limit=CLAIM_BATCH_SIZE):
+        claimed_ids = self.claim_pending_ids(limit=limit)
         if not claimed_ids:
-            return
-        processing = Notification.objects.filter(id__in=claimed_ids, status="processing")
-        for notification in processing:
-            try:
-                delivered = self.deliver(notification)
-                if delivered:
-                    notification.status = "sent"
-                    notification.sent_at = timezone.now()
-                else:
+            return 0
+        processing = list(
+            Notification.objects.filter(id__in=claimed_ids, status="processing")
+            .select_related("user")
+            .only("id", "channel", "payload", "status", "error_message", "user__email")
+            .order_by("created_at")
+        )
+        self.email_connection = self._open_email_connection(processing)
+        sent_ids = []
+        failed = []
+        unattempted = []
+        emails_on_connection = 0
+        consecutive_failures = 0
+        try:
+            for index, notification in enumerate(processing):
+                if notification.channel == "email" and self.email_connection is not None:
+                    if emails_on_connection >= MESSAGES_PER_CONNECTION:
+                        self.email_connection.close()
+                        self.email_connection = self._open_email_connection([notification])
+                        emails_on_connection = 0
+                    emails_on_connection += 1
+                delivered = False
+                try:
+                    delivered = self.deliver(notification)
+                    if delivered:
+                        sent_ids.append(notification.id)
+                    else:
+                        notification.status = "failed"
+                        notification.error_message = "delivery_failed"
+                        failed.append(notification)
+                except Exception as exc:
                     notification.status = "failed"
-                    notification.error_message = "delivery_failed"
-            except Exception as exc:
-                notification.status = "failed"
-                notification.error_message = str(exc)
-            notification.save(update_fields=["status", "sent_at", "error_message", "last_attempt_at"])
+                    notification.error_message = str(exc)
+                    failed.append(notification)
+                consecutive_failures = 0 if delivered else consecutive_failures + 1
+                if len(processing) >= ABORT_MIN_BATCH and consecutive_failures >= len(processing) // 3:
+                    # The relay looks broken; hand the rest back instead of failing them all.
+                    unattempted = processing[index + 1:]
+                    break
+        finally:
+            if self.email_connection is not None:
+                self.email_connection.close()
+                self.email_connection = None
+        if sent_ids:
+            Notification.objects.filter(id__in=sent_ids).update(status="sent", sent_at=timezone.now())
+        if failed:
+            Notification.objects.bulk_update(failed, ["status", "error_message"])
+        if unattempted:
+            Notification.objects.filter(id__in=[notification.id for notification in unattempted]).update(
+                status="pending",
+                last_attempt_at=None,
+            )
+        return len(sent_ids) + len(failed)
+
+
+ASSIGNMENT_TEMPLATES = {
+    "ASSIGNMENT_PUBLISHED": (
+        "Escala publicada",
+        "Sua escala foi publicada para {date} ({community}). Ver detalhes: {url}",
+    ),
+    "CONFIRMATION_REQUESTED": (
+        "Confirmacao de escala",
+        "Confirme sua escala em {date} ({community}). Ver detalhes: {url}",
+    ),
+    "REPLACEMENT_ASSIGNED": (
+        "Nova escala",
+        "Voce foi atribuido em {date} ({community}). Ver detalhes: {url}",
+    ),
+}
+
+SLOT_TEMPLATES = {
+    "ASSIGNMENT_CANCELED_ALERT_ADMIN": (
+        "Vaga aberta",
+        "Vaga aberta em {date} ({community}) - {position}. Ver detalhes: {url}",
+    ),
+}
+
+SWAP_TEMPLATES = {
+    "SWAP_REQUESTED": (
+        "Solicitacao de troca",
+        "Voce recebeu uma solicitacao de troca para {date} ({community}). Ver detalhes: {url}",
+    ),
+    "SWAP_ACCEPTED": (
+        "Troca aprovada",
+        "A troca para {date} ({community}) foi aprovada. Ver detalhes: {url}",
+    ),
+    "SWAP_REJECTED": (
+        "Troca recusada",
+        "A troca para {date} ({community}) foi recusada. Ver detalhes: {url}",
+    ),
+}
+
+CLAIM_TEMPLATES = {
+    "POSITION_CLAIM_REQUESTED": (
+        "Solicitacao de posicao",
+        "{requestor} solicitou sua posicao em {date} ({community}) - {position}. Ver detalhes: {url}",
+    ),
+    "POSITION_CLAIM_APPROVED": (
+        "Solicitacao aprovada",
+        "Sua solicitacao para {date} ({community}) - {position} foi aprovada. Ver detalhes: {url}",
+    ),
+    "POSITION_CLAIM_REJECTED": (
+        "Solicitacao recusada",
+        "Sua solicitacao para {date} ({community}) - {position} foi recusada. Ver detalhes: {url}",
+    ),
+    "POSITION_CLAIM_COORDINATION_REQUIRED": (
+        "Solicitacao aguardando aprovacao",
+        "Solicitacao de {requestor} para {date} ({community}) - {position} aguardando aprovacao. Ver detalhes: {url}",
+    ),
+}
+
+
+def _render_template(template, context):
+    subject, body = template
+    return {"subject": subject, "body": body.format(**context)}
 
 
 def _format_datetime(value):
-    return timezone.localtime(value).strftime("%d/%m %H:%M")
+    # No per-request timezone is ever activated, so the cached default zone is the local one.
+    return value.astimezone(timezone.get_default_timezone()).strftime("%d/%m %H:%M")
 
 
 def _absolute_url(path):
@@ -87,38 +227,59 @@ def _absolute_url(path):
     return path
 
 
-def _render_payload(template_code, parish, payload):
-    if payload.get("subject") and payload.get("body"):
-        return payload
-
-    assignment = payload.get("assignment")
-    if not assignment and payload.get("assignment_id"):
-        assignment = Assignment.objects.select_related(
-            "slot__mass_instance__community", "slot__position_type"
-        ).filter(parish=parish, id=payload["assignment_id"]).first()
-
-    slot = payload.get("slot")
-    if not slot and payload.get("slot_id"):
-        slot = AssignmentSlot.objects.select_related(
-            "mass_instance__community", "position_type"
-        ).filter(parish=parish, id=payload["slot_id"]).first()
-
-    swap = payload.get("swap")
-    if not swap and payload.get("swap_id"):
-        swap = SwapRequest.objects.select_related(
-            "mass_instance__community", "from_slot__position_type"
-        ).filter(parish=parish, id=payload["swap_id"]).first()
-
-    claim = payload.get("claim")
-    if not claim and payload.get("claim_id"):
-        claim = PositionClaimRequest.objects.select_related(
+PAYLOAD_RELATIONS = {
+    "assignment": (Assignment, ("slot__mass_instance__community", "slot__position_type")),
+    "slot": (AssignmentSlot, ("mass_instance__community", "position_type")),
+    "swap": (SwapRequest, ("mass_instance__community", "from_slot__position_type")),
+    "claim": (
+        PositionClaimRequest,
+        (
             "slot__mass_instance__community",
             "slot__position_type",
             "requestor_acolyte",
             "target_assignment__acolyte",
-        ).filter(parish=parish, id=payload["claim_id"]).first()
+        ),
+    ),
+}
+
+
+def _load_payload_objects(parish, payloads):
+    # One query per related kind for every payload that carries only an id.
+    ids = defaultdict(set)
+    for payload in payloads:
+        if payload.get("subject") and payload.get("body"):
+            continue
+        for name in PAYLOAD_RELATIONS:
+            if payload.get(f"{name}_id") and not payload.get(name):
+                ids[name].add(int(payload[f"{name}_id"]))
+    loaded = {}
+    for name, object_ids in ids.items():
+        model, related = PAYLOAD_RELATIONS[name]
+        loaded[name] = {
+            obj.id: obj for obj in model.objects.select_related(*related).filter(parish=parish, id__in=object_ids)
+        }
+    return loaded
+
+
+def _payload_object(payload, name, loaded):
+    obj = payload.get(name)
+    if not obj and payload.get(f"{name}_id"):
+        obj = loaded.get(name, {}).get(int(payload[f"{name}_id"]))
+    return obj
+
 
-    if assignment:
+def _render_payload(template_code, parish, payload, loaded=None):
+    if payload.get("subject") and payload.get("body"):
+        return payload
+
+    if loaded is None:
+        loaded = _load_payload_objects(parish, [payload])
+    assignment = _payload_object(payload, "assignment", loaded)
+    slot = _payload_object(payload, "slot", loaded)
+    swap = _payload_object(payload, "swap", loaded)
+    claim = _payload_object(payload, "claim", loaded)
+
+    if assignment and template_code in ASSIGNMENT_TEMPLATES:
         mass = assignment.slot.mass_instance
         context = {
             "date": _format_datetime(mass.starts_at),
@@ -126,23 +287,9 @@ def _render_payload(template_code, parish, payload):
             "position": assignment.slot.position_type.name,
             "url": _absolute_url(reverse("mass_detail", args=[mass.id])),
         }
-        if template_code == "ASSIGNMENT_PUBLISHED":
-            return {
-                "subject": "Escala publicada",
-                "body": f"Sua escala foi publicada para {context['date']} ({context['community']}). Ver detalhes: {context['url']}",
-            }
-        if template_code == "CONFIRMATION_REQUESTED":
-            return {
-                "subject": "Confirmacao de escala",
-                "body": f"Confirme sua escala em {context['date']} ({context['community']}). Ver detalhes: {context['url']}",
-            }
-        if template_code == "REPLACEMENT_ASSIGNED":
-            return {
-                "subject": "Nova escala",
-                "body": f"Voce foi atribuido em {context['date']} ({context['community']}). Ver detalhes: {context['url']}",
-            }
-
-    if slot:
+        return _render_template(ASSIGNMENT_TEMPLATES[template_code], context)
+
+    if slot and template_code in SLOT_TEMPLATES:
         mass = slot.mass_instance
         context = {
             "date": _format_datetime(mass.starts_at),
@@ -150,13 +297,9 @@ def _render_payload(template_code, parish, payload):
             "position": slot.position_type.name,
             "url": _absolute_url(reverse("mass_detail", args=[mass.id])),
         }
-        if template_code == "ASSIGNMENT_CANCELED_ALERT_ADMIN":
-            return {
-                "subject": "Vaga aberta",
-                "body": f"Vaga aberta em {context['date']} ({context['community']}) - {context['position']}. Ver detalhes: {context['url']}",
-            }
+        return _render_template(SLOT_TEMPLATES[template_code], context)
 
-    if swap:
+    if swap and template_code in SWAP_TEMPLATES:
         mass = swap.mass_instance
         context = {
             "date": _format_datetime(mass.starts_at),
@@ -164,23 +307,9 @@ def _render_payload(template_code, parish, payload):
             "position": swap.from_slot.position_type.name if swap.from_slot else "Funcao",
             "url": _absolute_url(reverse("swap_requests")),
         }
-        if template_code == "SWAP_REQUESTED":
-            return {
-                "subject": "Solicitacao de troca",
-                "body": f"Voce recebeu uma solicitacao de troca para {context['date']} ({context['community']}). Ver detalhes: {context['url']}",
-            }
-        if template_code == "SWAP_ACCEPTED":
-            return {
-                "subject": "Troca aprovada",
-                "body": f"A troca para {context['date']} ({context['community']}) foi aprovada. Ver detalhes: {context['url']}",
-            }
-        if template_code == "SWAP_REJECTED":
-            return {
-                "subject": "Troca recusada",
-                "body": f"A troca para {context['date']} ({context['community']}) foi recusada. Ver detalhes: {context['url']}",
-            }
-
-    if claim:
+        return _render_template(SWAP_TEMPLATES[template_code], context)
+
+    if claim and template_code in CLAIM_TEMPLATES:
         mass = claim.slot.mass_instance
         context = {
             "date": _format_datetime(mass.starts_at),
@@ -189,88 +318,100 @@ def _render_payload(template_code, parish, payload):
             "requestor": claim.requestor_acolyte.display_name,
             "url": _absolute_url(reverse("mass_detail", args=[mass.id])),
         }
-        if template_code == "POSITION_CLAIM_REQUESTED":
-            return {
-                "subject": "Solicitacao de posicao",
-                "body": f"{context['requestor']} solicitou sua posicao em {context['date']} ({context['community']}) - {context['position']}. Ver detalhes: {context['url']}",
-            }
-        if template_code == "POSITION_CLAIM_APPROVED":
-            return {
-                "subject": "Solicitacao aprovada",
-                "body": f"Sua solicitacao para {context['date']} ({context['community']}) - {context['position']} foi aprovada. Ver detalhes: {context['url']}",
-            }
-        if template_code == "POSITION_CLAIM_REJECTED":
-            return {
-                "subject": "Solicitacao recusada",
-                "body": f"Sua solicitacao para {context['date']} ({context['community']}) - {context['position']} foi recusada. Ver detalhes: {context['url']}",
-            }
-        if template_code == "POSITION_CLAIM_COORDINATION_REQUIRED":
-            return {
-                "subject": "Solicitacao aguardando aprovacao",
-                "body": f"Solicitacao de {context['requestor']} para {context['date']} ({context['community']}) - {context['position']} aguardando aprovacao. Ver detalhes: {context['url']}",
-            }
+        return _render_template(CLAIM_TEMPLATES[template_code], context)
 
     return {"subject": "Acoli", "body": "Voce tem uma nova atualizacao no sistema."}
 
 
-def enqueue_notification(parish, user, template_code, payload, idempotency_key, channel="email"):
-    if not idempotency_key.startswith(f"parish:{parish.id}:"):
-        idempotency_key = f"parish:{parish.id}:{idempotency_key}"
-    payload = _render_payload(template_code, parish, payload)
-    if channel == "email":
-        if not user.is_active:
-            notification, _ = Notification.objects.get_or_create(
-                channel=channel,
-                idempotency_key=idempotency_key,
-                defaults={
-                    "parish": parish,
-                    "user": user,
-                    "template_code": template_code,
-                    "payload": payload,
-                    "status": "skipped",
-                    "error_message": "user_inactive",
-                },
-            )
-            return notification
-        if not user.email:
-            notification, _ = Notification.objects.get_or_create(
-                channel=channel,
-                idempotency_key=idempotency_key,
-                defaults={
-                    "parish": parish,
-                    "user": user,
-                    "template_code": template_code,
-                    "payload": payload,
-                    "status": "skipped",
-                    "error_message": "missing_email",
-                },
+def load_preferences(parish, user_ids):
+    return {
+        pref.user_id: pref
+        for pref in NotificationPreference.objects.filter(parish=parish, user_id__in=set(user_ids))
+    }
+
+
+def _skip_reason(user, channel, pref):
+    if channel != "email":
+        return ""
+    if not user.is_active:
+        return "user_inactive"
+    if not user.email:
+        return "missing_email"
+    if pref and not pref.email_enabled:
+        return "email_disabled"
+    return ""
+
+
+def _payload_needs_lookup(payload):
+    if payload.get("subject") and payload.get("body"):
+        return False
+    return any(payload.get(f"{name}_id") and not payload.get(name) for name in PAYLOAD_RELATIONS)
+
+
+def _stored_notifications(keys):
+    return {
+        (notification.channel, notification.idempotency_key): notification
+        for notification in Notification.objects.filter(
+            channel__in={channel for channel, _ in keys},
+            idempotency_key__in=[idempotency_key for _, idempotency_key in keys],
+        )
+    }
+
+
+def enqueue_notifications(parish, specs, preferences=None):
+    # specs: (user, template_code, payload, idempotency_key, channel) tuples, written with one INSERT
+    prefix = f"parish:{parish.id}:"
+    specs = [
+        (user, template_code, payload, key if key.startswith(prefix) else prefix + key, channel)
+        for user, template_code, payload, key, channel in specs
+    ]
+    if not specs:
+        return []
+    keys = [(channel, key) for _, _, _, key, channel in specs]
+    existing = {}
+    if any(_payload_needs_lookup(payload) for _, _, payload, _, _ in specs):
+        # Rendering would query the database; skip it for notifications that already exist.
+        existing = _stored_notifications(keys)
+        specs = [spec for spec in specs if (spec[4], spec[3]) not in existing]
+    if specs:
+        if preferences is None:
+            preferences = load_preferences(
+                parish,
+                [user.id for user, _, _, _, channel in specs if channel == "email" and user.is_active and user.email],
             )
-            return notification
-        pref = NotificationPreference.objects.filter(parish=parish, user=user).first()
-        if pref and not pref.email_enabled:
-            notification, _ = Notification.objects.get_or_create(
-                channel=channel,
-                idempotency_key=idempotency_key,
-                defaults={
-                    "parish": parish,
-                    "user": user,
-                    "template_code": template_code,
-                    "payload": payload,
-                    "status": "skipped",
-                    "error_message": "email_disabled",
-                },
+        loaded = _load_payload_objects(parish, [payload for _, _, payload, _, _ in specs])
+        notifications = []
+        for user, template_code, payload, idempotency_key, channel in specs:
+            skip_reason = _skip_reason(user, channel, preferences.get(user.id))
+            notifications.append(
+                Notification(
+                    parish=parish,
+                    user=user,
+                    channel=channel,
+                    template_code=template_code,
+                    payload=_render_payload(template_code, parish, payload, loaded),
+                    idempotency_key=idempotency_key,
+                    status="skipped" if skip_reason else "pending",
+                    error_message=skip_reason,
+                )
             )
-            return notification
-    notification, _ = Notification.objects.get_or_create(
-        channel=channel,
-        idempotency_key=idempotency_key,
-        defaults={
-            "parish": parish,
-            "user": user,
-            "template_code": template_code,
-            "payload": payload,
-            "status": "pending",
-        },
-    )
-    return notification
+        Notification.objects.bulk_create(notifications, ignore_conflicts=True, batch_size=500)
+        existing.update(_stored_notifications([(channel, key) for _, _, _, key, channel in specs]))
+    return [existing[key] for key in keys]
+
+
+def enqueue_notification(parish, user, template_code, payload, idempotency_key, channel="email", preferences=None):
+    return enqueue_notifications(
+        parish, [(user, template_code, payload, idempotency_key, channel)], preferences=preferences
+    )[0]
 
+
+def enqueue_notification_for_users(parish, users, template_code, payload, idempotency_prefix, channel="email"):
+    users = list(users)
+    if not users:
+        return []
+    payload = _render_payload(template_code, parish, payload)
+    return enqueue_notifications(
+        parish,
+        [(user, template_code, payload, f"{idempotency_prefix}:{user.id}", channel) for user in users],
+    )
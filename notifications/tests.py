@@ -1,6 +1,9 @@
 from datetime import timedelta
+from io import StringIO
 
 from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
 from django.test import TestCase, override_settings
 from django.utils import timezone
 
@@ -13,8 +16,15 @@ from core.models import (
     Parish,
     PositionType,
 )
-from notifications.models import Notification
-from notifications.services import NotificationService, enqueue_notification
+from notifications.models import Notification, NotificationPreference
+from notifications.services import (
+    CLAIM_BATCH_SIZE,
+    NotificationService,
+    enqueue_notification,
+    enqueue_notification_for_users,
+    enqueue_notifications,
+    load_preferences,
+)
 
 
 class NotificationIdempotencyTests(TestCase):
@@ -32,6 +42,50 @@ class NotificationIdempotencyTests(TestCase):
         self.assertTrue(any(key.startswith(f"parish:{parish_a.id}:") for key in keys))
         self.assertTrue(any(key.startswith(f"parish:{parish_b.id}:") for key in keys))
 
+    def test_repeated_enqueue_returns_existing_notification(self):
+        User = get_user_model()
+        user = User.objects.create_user(email="user@example.com", full_name="User", password="pass")
+        parish = Parish.objects.create(name="Parish")
+        payload = {"subject": "Teste", "body": "Teste"}
+
+        first = enqueue_notification(parish, user, "ASSIGNMENT_PUBLISHED", payload, "publish:1")
+        second = enqueue_notification(parish, user, "ASSIGNMENT_PUBLISHED", payload, "publish:1")
+
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(first.status, "pending")
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_preloaded_preferences_skip_disabled_email(self):
+        User = get_user_model()
+        user = User.objects.create_user(email="user@example.com", full_name="User", password="pass")
+        parish = Parish.objects.create(name="Parish")
+        NotificationPreference.objects.create(parish=parish, user=user, email_enabled=False)
+        preferences = load_preferences(parish, [user.id])
+
+        with self.assertNumQueries(2):
+            notification = enqueue_notification(
+                parish,
+                user,
+                "ASSIGNMENT_PUBLISHED",
+                {"subject": "Teste", "body": "Teste"},
+                "publish:1",
+                preferences=preferences,
+            )
+
+        self.assertEqual(notification.status, "skipped")
+        self.assertEqual(notification.error_message, "email_disabled")
+
+    def test_repeated_enqueue_skips_rendering(self):
+        User = get_user_model()
+        user = User.objects.create_user(email="user@example.com", full_name="User", password="pass")
+        parish = Parish.objects.create(name="Parish")
+        first = enqueue_notification(parish, user, "ASSIGNMENT_PUBLISHED", {"assignment_id": 1}, "publish:1")
+
+        with self.assertNumQueries(1):
+            second = enqueue_notification(parish, user, "ASSIGNMENT_PUBLISHED", {"assignment_id": 1}, "publish:1")
+
+        self.assertEqual(first.id, second.id)
+
 
 class NotificationTemplateTests(TestCase):
     @override_settings(APP_BASE_URL="https://example.com")
@@ -68,6 +122,75 @@ class NotificationTemplateTests(TestCase):
         )
         self.assertIn("https://example.com", notification.payload.get("body", ""))
 
+    def test_fan_out_renders_payload_once(self):
+        User = get_user_model()
+        parish = Parish.objects.create(name="Parish")
+        community = Community.objects.create(parish=parish, code="MAT", name="Matriz")
+        position = PositionType.objects.create(parish=parish, code="LIB", name="Libriferario")
+        instance = MassInstance.objects.create(
+            parish=parish,
+            community=community,
+            starts_at=timezone.now(),
+            status="scheduled",
+        )
+        slot = AssignmentSlot.objects.create(
+            parish=parish,
+            mass_instance=instance,
+            position_type=position,
+            slot_index=1,
+            required=True,
+            status="open",
+        )
+        users = [
+            User.objects.create_user(email=f"admin{index}@example.com", full_name="Admin", password="pass")
+            for index in range(3)
+        ]
+
+        with self.assertNumQueries(4):
+            notifications = enqueue_notification_for_users(
+                parish,
+                users,
+                "ASSIGNMENT_CANCELED_ALERT_ADMIN",
+                {"slot_id": slot.id},
+                idempotency_prefix="cancel:1",
+            )
+
+        self.assertEqual(len(notifications), 3)
+        self.assertEqual({n.payload["subject"] for n in notifications}, {"Vaga aberta"})
+        self.assertEqual(
+            {n.idempotency_key for n in notifications},
+            {f"parish:{parish.id}:cancel:1:{user.id}" for user in users},
+        )
+
+
+    def test_batch_loads_payload_objects_once(self):
+        User = get_user_model()
+        parish = Parish.objects.create(name="Parish")
+        community = Community.objects.create(parish=parish, code="MAT", name="Matriz")
+        position = PositionType.objects.create(parish=parish, code="LIB", name="Libriferario")
+        specs = []
+        for index in range(3):
+            user = User.objects.create_user(email=f"acolito{index}@example.com", full_name="Acolito", password="pass")
+            acolyte = AcolyteProfile.objects.create(parish=parish, user=user, display_name=f"Acolito {index}")
+            instance = MassInstance.objects.create(
+                parish=parish,
+                community=community,
+                starts_at=timezone.now() + timedelta(days=index),
+                status="scheduled",
+            )
+            slot = AssignmentSlot.objects.create(parish=parish, mass_instance=instance, position_type=position)
+            assignment = Assignment.objects.create(parish=parish, slot=slot, acolyte=acolyte)
+            specs.append(
+                (user, "REPLACEMENT_ASSIGNED", {"assignment_id": assignment.id}, f"replacement:{assignment.id}", "email")
+            )
+
+        # Existing-key lookup, preferences, assignments, insert and read-back.
+        with self.assertNumQueries(5):
+            notifications = enqueue_notifications(parish, specs)
+
+        self.assertEqual(len(notifications), 3)
+        self.assertTrue(all("MAT" in notification.payload["body"] for notification in notifications))
+
 
 class NotificationProcessingTests(TestCase):
     def setUp(self):
@@ -146,6 +269,75 @@ class NotificationProcessingTests(TestCase):
         self.assertIsNone(notification.sent_at)
         self.assertTrue(notification.error_message)
 
+    def test_send_pending_writes_results_in_one_batch(self):
+        for index in range(3):
+            Notification.objects.create(
+                parish=self.parish,
+                user=self.user,
+                channel="email",
+                template_code="ASSIGNMENT_PUBLISHED",
+                payload={"subject": "Teste", "body": "Teste"},
+                idempotency_key=f"parish:1:batch:{index}",
+            )
+        with self.assertNumQueries(6):
+            NotificationService().send_pending()
+        self.assertEqual(Notification.objects.filter(status="sent", sent_at__isnull=False).count(), 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_send_pending_delivers_oldest_first(self):
+        now = timezone.now()
+        for index, age in enumerate((1, 3, 2)):
+            notification = Notification.objects.create(
+                parish=self.parish,
+                user=self.user,
+                channel="email",
+                template_code="ASSIGNMENT_PUBLISHED",
+                payload={"subject": f"Teste {age}", "body": "Teste"},
+                idempotency_key=f"parish:1:order:{index}",
+            )
+            Notification.objects.filter(id=notification.id).update(created_at=now - timedelta(minutes=age))
+        NotificationService().send_pending()
+        self.assertEqual([message.subject for message in mail.outbox], ["Teste 3", "Teste 2", "Teste 1"])
+
+    def test_failing_relay_hands_back_rest_of_batch(self):
+        class FailingService(NotificationService):
+            def deliver(self, notification):
+                raise RuntimeError("relay down")
+
+        Notification.objects.bulk_create(
+            [
+                Notification(
+                    parish=self.parish,
+                    user=self.user,
+                    channel="whatsapp",
+                    template_code="ASSIGNMENT_PUBLISHED",
+                    payload={"subject": "Teste", "body": "Teste"},
+                    idempotency_key=f"parish:1:relay:{index}",
+                )
+                for index in range(30)
+            ]
+        )
+        FailingService().send_pending()
+        self.assertEqual(Notification.objects.filter(status="failed").count(), 10)
+        self.assertEqual(Notification.objects.filter(status="pending", last_attempt_at__isnull=True).count(), 20)
+
+    def test_command_drains_queue_in_batches(self):
+        Notification.objects.bulk_create(
+            [
+                Notification(
+                    parish=self.parish,
+                    user=self.user,
+                    channel="email",
+                    template_code="ASSIGNMENT_PUBLISHED",
+                    payload={"subject": "Teste", "body": "Teste"},
+                    idempotency_key=f"parish:1:drain:{index}",
+                )
+                for index in range(CLAIM_BATCH_SIZE + 5)
+            ]
+        )
+        call_command("send_notifications", stdout=StringIO())
+        self.assertEqual(Notification.objects.filter(status="sent").count(), CLAIM_BATCH_SIZE + 5)
+
     def test_reclaim_stuck_processing(self):
         now = timezone.now()
         stuck = Notification.objects.create(
@@ -1,11 +1,10 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
-from scheduler.models import ScheduleJobRequest
 from core.models import AssignmentSlot
 from core.services.replacements import assign_replacement, assign_replacement_request
-from notifications.services import enqueue_notification
-from scheduler.services.jobs import claim_job
+from notifications.services import enqueue_notifications
+from scheduler.services.jobs import JOB_CLAIM_BATCH_SIZE, claim_pending_jobs
 from scheduler.services.horizon import build_horizon_instances
 from scheduler.services.solver import solve_open_slots, solve_schedule
 
@@ -15,81 +14,101 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("--parish-id", type=int)
+        parser.add_argument("--claim-batch", type=int, default=JOB_CLAIM_BATCH_SIZE)
 
     def handle(self, *args, **options):
         parish_id = options.get("parish_id")
-        jobs = ScheduleJobRequest.objects.filter(status="pending").order_by("created_at")
-        if parish_id:
-            jobs = jobs.filter(parish_id=parish_id)
-        for job in jobs:
-            if not claim_job(job.id):
-                continue
-            job.refresh_from_db()
-            try:
-                parish = job.parish
-                weights = parish.schedule_weights or {}
-                if job.job_type == "replacement":
-                    payload = job.payload_json or {}
-                    slot_ids = payload.get("slot_ids") or []
-                    if payload.get("slot_id"):
-                        slot_ids.append(payload.get("slot_id"))
-                    slots = AssignmentSlot.objects.filter(parish=parish, id__in=slot_ids)
-                    result = solve_open_slots(parish, slots, weights)
-                    assigned = 0
-                    replacement_id = payload.get("replacement_request_id")
-                    for slot_id, acolyte in result.assigned_map.items():
-                        try:
-                            if replacement_id:
-                                assignment = assign_replacement_request(parish, replacement_id, acolyte, actor=None)
-                            else:
-                                slot = AssignmentSlot.objects.filter(parish=parish, id=slot_id).first()
-                                assignment = assign_replacement(parish, slot, acolyte, actor=None) if slot else None
-                            if assignment:
-                                assigned += 1
-                                if assignment.acolyte.user:
-                                    enqueue_notification(
-                                        parish,
+        claim_batch = max(1, options.get("claim_batch") or JOB_CLAIM_BATCH_SIZE)
+        weights_by_parish = {}
+        while True:
+            jobs = claim_pending_jobs(parish_id=parish_id, limit=claim_batch)
+            if not jobs:
+                break
+            for job in jobs:
+                self._run_job(job, weights_by_parish)
+
+    def _run_job(self, job, weights_by_parish):
+        try:
+            parish = job.parish
+            if parish.id not in weights_by_parish:
+                weights_by_parish[parish.id] = parish.schedule_weights or {}
+            weights = weights_by_parish[parish.id]
+            if job.job_type == "replacement":
+                payload = job.payload_json or {}
+                slot_ids = set(payload.get("slot_ids") or [])
+                if payload.get("slot_id"):
+                    slot_ids.add(payload["slot_id"])
+                slots = list(
+                    AssignmentSlot.objects.filter(parish=parish, id__in=slot_ids).select_related(
+                        "mass_instance", "position_type"
+                    )
+                )
+                slot_map = {slot.id: slot for slot in slots}
+                result = solve_open_slots(parish, slots, weights)
+                assigned = 0
+                replacement_id = payload.get("replacement_request_id")
+                notification_specs = []
+                for slot_id, acolyte in result.assigned_map.items():
+                    try:
+                        if replacement_id:
+                            assignment = assign_replacement_request(parish, replacement_id, acolyte, actor=None)
+                        else:
+                            slot = slot_map.get(slot_id)
+                            assignment = assign_replacement(parish, slot, acolyte, actor=None) if slot else None
+                        if assignment:
+                            assigned += 1
+                            if assignment.acolyte.user:
+                                notification_specs.append(
+                                    (
                                         assignment.acolyte.user,
                                         "REPLACEMENT_ASSIGNED",
                                         {"assignment_id": assignment.id},
-                                        idempotency_key=f"replacement:{assignment.id}",
+                                        f"replacement:{assignment.id}",
+                                        "email",
                                     )
-                        except Exception:
-                            continue
-                    job.status = "success" if result.feasible else "failed"
-                    job.summary_json = {
-                        "coverage": result.coverage,
-                        "preference_score": result.preference_score,
-                        "fairness_std": result.fairness_std,
-                        "changes": assigned,
-                        "required_slots_count": result.required_slots_count,
-                        "unfilled_slots_count": result.unfilled_slots_count,
-                        "unfilled_details": result.unfilled_details,
-                    }
-                    if not result.feasible:
-                        job.error_message = "Slots sem candidatos para cobertura."
-                else:
-                    instances = build_horizon_instances(parish, job.horizon_days)
-                    result = solve_schedule(parish, instances, parish.consolidation_days, weights, allow_changes=job.force_republish)
-                    job.status = "success" if result.feasible else "failed"
-                    job.summary_json = {
-                        "coverage": result.coverage,
-                        "preference_score": result.preference_score,
-                        "fairness_std": result.fairness_std,
-                        "changes": result.changes,
-                        "required_slots_count": result.required_slots_count,
-                        "unfilled_slots_count": result.unfilled_slots_count,
-                        "unfilled_details": result.unfilled_details,
-                    }
-                    if not result.feasible:
-                        job.error_message = "Slots sem candidatos para cobertura."
-                job.finished_at = timezone.now()
-                job.save(update_fields=["status", "summary_json", "finished_at", "error_message"])
-                self.stdout.write(self.style.SUCCESS(f"Job {job.id} completed"))
-            except Exception as exc:
-                job.status = "failed"
-                job.error_message = str(exc)
-                job.finished_at = timezone.now()
-                job.save(update_fields=["status", "error_message", "finished_at"])
-                self.stderr.write(self.style.ERROR(f"Job {job.id} failed: {exc}"))
+                                )
+                    except Exception:
+                        continue
+                if notification_specs:
+                    # The assignments are already committed; a notification failure must not fail the job.
+                    try:
+                        enqueue_notifications(parish, notification_specs)
+                    except Exception as exc:
+                        self.stderr.write(self.style.WARNING(f"Job {job.id}: notifications not enqueued: {exc}"))
+                job.status = "success" if result.feasible else "failed"
+                job.summary_json = {
+                    "coverage": result.coverage,
+                    "preference_score": result.preference_score,
+                    "fairness_std": result.fairness_std,
+                    "changes": assigned,
+                    "required_slots_count": result.required_slots_count,
+                    "unfilled_slots_count": result.unfilled_slots_count,
+                    "unfilled_details": result.unfilled_details,
+                }
+                if not result.feasible:
+                    job.error_message = "Slots sem candidatos para cobertura."
+            else:
+                instances = build_horizon_instances(parish, job.horizon_days)
+                result = solve_schedule(parish, instances, parish.consolidation_days, weights, allow_changes=job.force_republish)
+                job.status = "success" if result.feasible else "failed"
+                job.summary_json = {
+                    "coverage": result.coverage,
+                    "preference_score": result.preference_score,
+                    "fairness_std": result.fairness_std,
+                    "changes": result.changes,
+                    "required_slots_count": result.required_slots_count,
+                    "unfilled_slots_count": result.unfilled_slots_count,
+                    "unfilled_details": result.unfilled_details,
+                }
+                if not result.feasible:
+                    job.error_message = "Slots sem candidatos para cobertura."
+            job.finished_at = timezone.now()
+            job.save(update_fields=["status", "summary_json", "finished_at", "error_message"])
+            self.stdout.write(self.style.SUCCESS(f"Job {job.id} completed"))
+        except Exception as exc:
+            job.status = "failed"
+            job.error_message = str(exc)
+            job.finished_at = timezone.now()
+            job.save(update_fields=["status", "error_message", "finished_at"])
+            self.stderr.write(self.style.ERROR(f"Job {job.id} failed: {exc}"))
 
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.7 on 2026-10-17 01:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_massinstance_core_massin_communi_61a5dd_idx'),
+        ('scheduler', '0003_schedulejobrequest_job_type_payload'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='schedulejobrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['status', 'created_at'], name='sched_job_pending_idx'),
+        ),
+    ]
@@ -28,3 +28,12 @@ class ScheduleJobRequest(models.Model):
     finished_at = models.DateTimeField(null=True, blank=True)
     error_message = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "created_at"],
+                name="sched_job_pending_idx",
+                condition=models.Q(status="pending"),
+            )
+        ]
+
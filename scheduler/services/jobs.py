@@ -1,7 +1,11 @@
+from django.db import connection, transaction
 from django.utils import timezone
 
 from scheduler.models import ScheduleJobRequest
 
+# Solver jobs take seconds each; claiming one at a time leaves the rest to other workers.
+JOB_CLAIM_BATCH_SIZE = 1
+
 
 def claim_job(job_id, now=None):
     now = now or timezone.now()
@@ -10,3 +14,32 @@ def claim_job(job_id, now=None):
         started_at=now,
     )
     return updated == 1
+
+
+def claim_pending_jobs(parish_id=None, limit=JOB_CLAIM_BATCH_SIZE, now=None):
+    now = now or timezone.now()
+    pending = ScheduleJobRequest.objects.filter(status="pending").select_related("parish").order_by("created_at")
+    if parish_id:
+        pending = pending.filter(parish_id=parish_id)
+    if connection.features.has_select_for_update_skip_locked:
+        # Jobs locked by another worker's claim are skipped rather than waited on; only the
+        # job rows are locked, parish rows are shared by every job of the parish.
+        with transaction.atomic():
+            jobs = list(pending.select_for_update(skip_locked=True, of=("self",))[:limit])
+            if jobs:
+                ScheduleJobRequest.objects.filter(id__in=[job.id for job in jobs]).update(
+                    status="running", started_at=now
+                )
+        for job in jobs:
+            job.status = "running"
+            job.started_at = now
+        return jobs
+    job_ids = list(pending.values_list("id", flat=True)[:limit])
+    if not job_ids:
+        return []
+    ScheduleJobRequest.objects.filter(id__in=job_ids, status="pending").update(status="running", started_at=now)
+    return list(
+        ScheduleJobRequest.objects.filter(id__in=job_ids, status="running", started_at=now)
+        .select_related("parish")
+        .order_by("created_at")
+    )
@@ -5,16 +5,20 @@ from core.services.recommendations import build_recommendation_cache, rank_candi
 def build_quick_fill_cache(parish, position_type_ids=None, slots=None):
     cache = build_recommendation_cache(parish, slots=slots)
     if position_type_ids:
-        filtered = {}
-        for position_id, acolyte_ids in cache["qualified_by_position"].items():
-            if position_id in position_type_ids:
-                filtered[position_id] = acolyte_ids
-        cache["qualified_by_position"] = filtered
-        qualified_pairs = {}
-        for position_id, acolyte_ids in filtered.items():
-            for acolyte_id in acolyte_ids:
-                qualified_pairs[(acolyte_id, position_id)] = True
-        cache["qualified_pairs"] = qualified_pairs
+        position_type_ids = set(position_type_ids)
+        # Slots already narrow the cache to their positions; only re-filter for a narrower set.
+        if not position_type_ids.issuperset(cache["qualified_by_position"]):
+            filtered = {
+                position_id: acolyte_ids
+                for position_id, acolyte_ids in cache["qualified_by_position"].items()
+                if position_id in position_type_ids
+            }
+            cache["qualified_by_position"] = filtered
+            cache["qualified_pairs"] = {
+                (acolyte_id, position_id): True
+                for position_id, acolyte_ids in filtered.items()
+                for acolyte_id in acolyte_ids
+            }
     return cache
 
 
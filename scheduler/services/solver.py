@@ -1,10 +1,11 @@
+import heapq
 from collections import defaultdict
 from datetime import timedelta
 
 from django.utils import timezone
 from ortools.sat.python import cp_model
 
-from django.db.models import Prefetch
+from django.db.models import Prefetch, prefetch_related_objects
 
 from core.models import (
     AcolyteIntent,
@@ -21,6 +22,7 @@ from core.services.recommendations import (
     get_mass_context,
     is_candidate_eligible_dynamic,
     is_candidate_eligible_static,
+    qualified_acolytes,
     score_candidate,
 )
 
@@ -50,18 +52,27 @@ class ScheduleSolveResult:
 
 
 def _ensure_slots(instances):
-    for instance in instances:
-        if not instance.requirement_profile:
-            continue
-        for position in instance.requirement_profile.positions.select_related("position_type").all():
-            for idx in range(1, position.quantity + 1):
-                AssignmentSlot.objects.get_or_create(
-                    parish=instance.parish,
-                    mass_instance=instance,
-                    position_type=position.position_type,
-                    slot_index=idx,
-                    defaults={"required": True, "status": "open"},
-                )
+    instances = [instance for instance in instances if instance.requirement_profile_id]
+    if not instances:
+        return
+    prefetch_related_objects(instances, "requirement_profile__positions")
+    # Existing slots are left untouched: the (mass_instance, position_type, slot_index) unique
+    # constraint makes the database skip them.
+    desired = [
+        AssignmentSlot(
+            parish_id=instance.parish_id,
+            mass_instance=instance,
+            position_type_id=position.position_type_id,
+            slot_index=idx,
+            required=True,
+            status="open",
+        )
+        for instance in instances
+        for position in instance.requirement_profile.positions.all()
+        for idx in range(1, position.quantity + 1)
+    ]
+    if desired:
+        AssignmentSlot.objects.bulk_create(desired, ignore_conflicts=True)
 
 
 def solve_schedule(parish, instances, consolidation_days, weights, allow_changes=False):
@@ -99,8 +110,12 @@ def solve_schedule(parish, instances, consolidation_days, weights, allow_changes
         return ScheduleSolveResult(coverage=0, preference_score=0, fairness_std=0, changes=0, feasible=False)
     reserve_ids = {acolyte.id for acolyte in acolytes if acolyte.scheduling_mode == "reserve"}
 
-    preferences = AcolytePreference.objects.filter(parish=parish)
-    intents = {intent.acolyte_id: intent for intent in AcolyteIntent.objects.filter(parish=parish)}
+    intents = {
+        acolyte_id: (desired_frequency, willingness_level)
+        for acolyte_id, desired_frequency, willingness_level in AcolyteIntent.objects.filter(
+            parish=parish, acolyte_id__in=[acolyte.id for acolyte in acolytes]
+        ).values_list("acolyte_id", "desired_frequency_per_month", "willingness_level")
+    }
 
     cache = build_recommendation_cache(parish, slots=decision_slots, acolytes=acolytes)
     cache["weights"] = weights
@@ -117,6 +132,8 @@ def solve_schedule(parish, instances, consolidation_days, weights, allow_changes
     except (TypeError, ValueError):
         max_candidates = None
 
+    # (slot_id, acolyte_id) -> score; context and local count are fixed per slot, so each pair is scored once.
+    candidate_scores = {}
     for slot in decision_slots:
         context = get_mass_context(slot.mass_instance, cache["weights"], cache.get("interest_map"), cache["now"])
         context_by_slot[slot.id] = context
@@ -140,9 +157,10 @@ def solve_schedule(parish, instances, consolidation_days, weights, allow_changes
                     cache,
                     local_eligible_count=local_eligible_count,
                 )
+                candidate_scores[(slot.id, acolyte.id)] = score
                 scored.append((score, acolyte))
-            scored.sort(key=lambda item: item[0], reverse=True)
-            slot_candidates = [acolyte for _score, acolyte in scored[: int(max_candidates)]]
+            top = heapq.nlargest(int(max_candidates), scored, key=lambda item: item[0])
+            slot_candidates = [acolyte for _score, acolyte in top]
         candidates[slot.id] = slot_candidates
 
     unfilled_details = []
@@ -200,9 +218,12 @@ def solve_schedule(parish, instances, consolidation_days, weights, allow_changes
     model = cp_model.CpModel()
     x = {}
 
+    # (mass_instance_id, acolyte_id) -> that acolyte's vars across the mass's slots.
+    mass_vars = defaultdict(list)
     for slot in decision_slots:
         for acolyte in candidates.get(slot.id, []):
             x[(slot.id, acolyte.id)] = model.NewBoolVar(f"x_{slot.id}_{acolyte.id}")
+            mass_vars[(slot.mass_instance_id, acolyte.id)].append(x[(slot.id, acolyte.id)])
 
     for slot in decision_slots:
         vars_for_slot = [x[(slot.id, a.id)] for a in candidates.get(slot.id, [])]
@@ -213,11 +234,9 @@ def solve_schedule(parish, instances, consolidation_days, weights, allow_changes
     slots_by_mass = defaultdict(list)
     for slot in decision_slots:
         slots_by_mass[slot.mass_instance_id].append(slot)
-    for mass_slots in slots_by_mass.values():
-        for acolyte in acolytes:
-            vars_for_acolyte = [x[(slot.id, acolyte.id)] for slot in mass_slots if (slot.id, acolyte.id) in x]
-            if vars_for_acolyte:
-                model.Add(sum(vars_for_acolyte) <= 1)
+    for vars_for_acolyte in mass_vars.values():
+        if len(vars_for_acolyte) > 1:
+            model.Add(sum(vars_for_acolyte) <= 1)
 
     senior_ids = {acolyte.id for acolyte in acolytes if acolyte.experience_level == "senior"}
     if senior_ids:
@@ -238,39 +257,40 @@ def solve_schedule(parish, instances, consolidation_days, weights, allow_changes
     mass_duration = int(getattr(parish, "default_mass_duration_minutes", 60))
     rest_minutes = int(getattr(parish, "min_rest_minutes_between_masses", 0))
     min_gap = (mass_duration + rest_minutes) * 60
-    sorted_slots = sorted(decision_slots, key=lambda slot: slot.mass_instance.starts_at)
+    starts_by_slot = {slot.id: slot.mass_instance.starts_at for slot in decision_slots}
+    week_by_slot = {slot_id: starts.isocalendar()[:2] for slot_id, starts in starts_by_slot.items()}
+    sorted_slots = sorted(decision_slots, key=lambda slot: starts_by_slot[slot.id])
     conflict_pairs = []
     for idx, slot_a in enumerate(sorted_slots):
-        a_start = slot_a.mass_instance.starts_at
-        for slot_b in sorted_slots[idx + 1 :]:
-            if slot_a.mass_instance_id == slot_b.mass_instance_id:
-                continue
-            b_start = slot_b.mass_instance.starts_at
-            if (b_start - a_start).total_seconds() >= min_gap:
+        a_start = starts_by_slot[slot_a.id]
+        next_idx = idx + 1
+        while next_idx < len(sorted_slots):
+            slot_b = sorted_slots[next_idx]
+            if (starts_by_slot[slot_b.id] - a_start).total_seconds() >= min_gap:
                 break
-            conflict_pairs.append((slot_a, slot_b))
-    for acolyte in acolytes:
-        for slot_a, slot_b in conflict_pairs:
-            if (slot_a.id, acolyte.id) in x and (slot_b.id, acolyte.id) in x:
-                model.Add(x[(slot_a.id, acolyte.id)] + x[(slot_b.id, acolyte.id)] <= 1)
+            if slot_a.mass_instance_id != slot_b.mass_instance_id:
+                conflict_pairs.append((slot_a, slot_b))
+            next_idx += 1
+    # Only acolytes that are candidates for both slots of a pair can conflict.
+    candidate_ids = {slot.id: {acolyte.id for acolyte in candidates.get(slot.id, [])} for slot in decision_slots}
+    for slot_a, slot_b in conflict_pairs:
+        for acolyte_id in candidate_ids[slot_a.id] & candidate_ids[slot_b.id]:
+            model.Add(x[(slot_a.id, acolyte_id)] + x[(slot_b.id, acolyte_id)] <= 1)
 
     decision_week_counts = defaultdict(lambda: defaultdict(int))
     for slot in decision_slots:
         for assignment in getattr(slot, "active_assignments", []):
-            week_key = slot.mass_instance.starts_at.isocalendar()[:2]
-            decision_week_counts[assignment.acolyte_id][week_key] += 1
+            decision_week_counts[assignment.acolyte_id][week_by_slot[slot.id]] += 1
 
     max_services_per_week = weights.get("max_services_per_week")
     if max_services_per_week:
         slots_by_week = defaultdict(list)
         for slot in decision_slots:
-            key = slot.mass_instance.starts_at.isocalendar()[:2]
-            slots_by_week[key].append(slot)
-        for week_slots in slots_by_week.values():
+            slots_by_week[week_by_slot[slot.id]].append(slot)
+        for week_key, week_slots in slots_by_week.items():
             for acolyte in acolytes:
                 vars_for_week = [x[(slot.id, acolyte.id)] for slot in week_slots if (slot.id, acolyte.id) in x]
                 if vars_for_week:
-                    week_key = week_slots[0].mass_instance.starts_at.isocalendar()[:2]
                     existing = cache["weekly_counts_by_acolyte"].get(acolyte.id, {}).get(week_key, 0)
                     existing -= decision_week_counts.get(acolyte.id, {}).get(week_key, 0)
                     if existing < 0:
@@ -284,9 +304,10 @@ def solve_schedule(parish, instances, consolidation_days, weights, allow_changes
     if max_consecutive_weekends:
         weekend_map = defaultdict(list)
         for slot in decision_slots:
-            weekday = slot.mass_instance.starts_at.weekday()
+            starts = starts_by_slot[slot.id]
+            weekday = starts.weekday()
             if weekday in (5, 6):
-                date = slot.mass_instance.starts_at.date()
+                date = starts.date()
                 if weekday == 6:
                     date = date - timedelta(days=1)
                 weekend_map[date].append(slot)
@@ -317,7 +338,7 @@ def solve_schedule(parish, instances, consolidation_days, weights, allow_changes
     consolidation_limit = timezone.now() + timedelta(days=consolidation_days)
     locked_slots = []
     for slot in decision_slots:
-        if slot.mass_instance.starts_at <= consolidation_limit and slot.is_locked:
+        if starts_by_slot[slot.id] <= consolidation_limit and slot.is_locked:
             locked_slots.append(slot)
     for slot in locked_slots:
         existing_assignment = slot.get_active_assignment()
@@ -327,42 +348,51 @@ def solve_schedule(parish, instances, consolidation_days, weights, allow_changes
                 if (slot.id, acolyte.id) in x:
                     model.Add(x[(slot.id, acolyte.id)] == value)
 
-    preference_terms = []
-    fairness_terms = []
-    stability_terms = []
-    partner_terms = []
-    family_terms = []
+    # Objective terms are kept as parallel variable/coefficient lists so the whole objective
+    # is built as a single weighted sum instead of a tree of Python expression objects.
+    objective_vars = []
+    objective_coefs = []
 
+    stability_penalty = weights.get("stability_penalty", 10)
     for slot in decision_slots:
         context = context_by_slot.get(slot.id)
         local_count = local_eligible_count_by_slot.get(slot.id, 0)
+        existing_assignment = slot.get_active_assignment()
+        keep_acolyte_id = None
+        if not allow_changes and existing_assignment and existing_assignment.assignment_state in ["published", "locked"]:
+            keep_acolyte_id = existing_assignment.acolyte_id
         for acolyte in candidates.get(slot.id, []):
-            base_score = score_candidate(
-                acolyte,
-                slot,
-                context,
-                cache,
-                local_eligible_count=local_count,
-            )
-            preference_terms.append(base_score * x[(slot.id, acolyte.id)])
-
-            existing_assignment = slot.get_active_assignment()
-            if existing_assignment and existing_assignment.assignment_state in ["published", "locked"]:
-                if not allow_changes:
-                    penalty = weights.get("stability_penalty", 10)
-                    if acolyte.id != existing_assignment.acolyte_id:
-                        stability_terms.append(penalty * x[(slot.id, acolyte.id)])
-
-    partner_prefs = [pref for pref in preferences if pref.preference_type in ["preferred_partner", "avoid_partner"] and pref.target_acolyte_id]
+            key = (slot.id, acolyte.id)
+            if key not in candidate_scores:
+                candidate_scores[key] = score_candidate(
+                    acolyte,
+                    slot,
+                    context,
+                    cache,
+                    local_eligible_count=local_count,
+                )
+            objective_vars.append(x[key])
+            if keep_acolyte_id is not None and acolyte.id != keep_acolyte_id:
+                objective_coefs.append(candidate_scores[key] - stability_penalty)
+            else:
+                objective_coefs.append(candidate_scores[key])
+
+    partner_prefs = list(
+        AcolytePreference.objects.filter(
+            parish=parish,
+            preference_type__in=["preferred_partner", "avoid_partner"],
+            target_acolyte__isnull=False,
+        ).only("acolyte_id", "target_acolyte_id", "preference_type", "weight")
+    )
     if partner_prefs:
         partner_ids = set()
         for pref in partner_prefs:
             partner_ids.add(pref.acolyte_id)
             partner_ids.add(pref.target_acolyte_id)
         mass_acolyte_vars = defaultdict(dict)
-        for mass_id, mass_slots in slots_by_mass.items():
+        for mass_id in slots_by_mass:
             for acolyte_id in partner_ids:
-                vars_for_acolyte = [x[(slot.id, acolyte_id)] for slot in mass_slots if (slot.id, acolyte_id) in x]
+                vars_for_acolyte = mass_vars.get((mass_id, acolyte_id))
                 if not vars_for_acolyte:
                     continue
                 assigned_var = model.NewBoolVar(f"mass_{mass_id}_a_{acolyte_id}")
@@ -383,7 +413,8 @@ def solve_schedule(parish, instances, consolidation_days, weights, allow_changes
                 weight = pref.weight or 0
                 if pref.preference_type == "avoid_partner":
                     weight = -weight
-                partner_terms.append(weight * pair_var)
+                objective_vars.append(pair_var)
+                objective_coefs.append(weight)
 
     family_bonus = int(weights.get("family_group_bonus", 2))
     if family_bonus:
@@ -394,14 +425,10 @@ def solve_schedule(parish, instances, consolidation_days, weights, allow_changes
         for family_id, members in families.items():
             if len(members) < 2:
                 continue
-            for mass_id, mass_slots in slots_by_mass.items():
+            for mass_id in slots_by_mass:
                 member_vars = {}
                 for acolyte_id in members:
-                    vars_for_acolyte = [
-                        x[(slot.id, acolyte_id)]
-                        for slot in mass_slots
-                        if (slot.id, acolyte_id) in x
-                    ]
+                    vars_for_acolyte = mass_vars.get((mass_id, acolyte_id))
                     if not vars_for_acolyte:
                         continue
                     assigned_var = model.NewBoolVar(f"family_{family_id}_{mass_id}_{acolyte_id}")
@@ -416,24 +443,24 @@ def solve_schedule(parish, instances, consolidation_days, weights, allow_changes
                         model.Add(pair_var <= member_vars[acolyte_id])
                         model.Add(pair_var <= member_vars[other_id])
                         model.Add(pair_var >= member_vars[acolyte_id] + member_vars[other_id] - 1)
-                        family_terms.append(family_bonus * pair_var)
+                        objective_vars.append(pair_var)
+                        objective_coefs.append(family_bonus)
 
     horizon_days = 30
     if decision_slots:
-        starts = [slot.mass_instance.starts_at for slot in decision_slots]
+        starts = list(starts_by_slot.values())
         horizon_days = max((max(starts) - min(starts)).days, 1)
 
     if acolytes:
         base_target = len(decision_slots) / len(acolytes)
         raw_targets = {}
         for acolyte in acolytes:
-            intent = intents.get(acolyte.id)
+            desired_frequency, level = intents.get(acolyte.id, (None, "normal"))
             if acolyte.id in reserve_ids:
                 raw_target = 0
-            elif intent and intent.desired_frequency_per_month:
-                raw_target = intent.desired_frequency_per_month * (horizon_days / 30)
+            elif desired_frequency:
+                raw_target = desired_frequency * (horizon_days / 30)
             else:
-                level = getattr(intent, "willingness_level", "normal") if intent else "normal"
                 factor = {"low": 0.8, "normal": 1.0, "high": 1.2}.get(level, 1.0)
                 raw_target = base_target * factor
             raw_targets[acolyte.id] = raw_target
@@ -441,6 +468,7 @@ def solve_schedule(parish, instances, consolidation_days, weights, allow_changes
         scale = len(decision_slots) / total_raw
         target_loads = {acolyte_id: int(round(raw * scale)) for acolyte_id, raw in raw_targets.items()}
 
+        fairness_penalty = -weights.get("fairness_penalty", 1)
         for acolyte in acolytes:
             vars_for_acolyte = [x[(slot.id, acolyte.id)] for slot in decision_slots if (slot.id, acolyte.id) in x]
             if vars_for_acolyte:
@@ -449,21 +477,10 @@ def solve_schedule(parish, instances, consolidation_days, weights, allow_changes
                 model.Add(diff == sum(vars_for_acolyte) - target)
                 abs_diff = model.NewIntVar(0, len(decision_slots), f"abs_diff_{acolyte.id}")
                 model.AddAbsEquality(abs_diff, diff)
-                fairness_terms.append(abs_diff)
-
-    objective_terms = []
-    if preference_terms:
-        objective_terms.append(sum(preference_terms))
-    if fairness_terms:
-        objective_terms.append(-weights.get("fairness_penalty", 1) * sum(fairness_terms))
-    if stability_terms:
-        objective_terms.append(-sum(stability_terms))
-    if partner_terms:
-        objective_terms.append(sum(partner_terms))
-    if family_terms:
-        objective_terms.append(sum(family_terms))
-
-    model.Maximize(sum(objective_terms) if objective_terms else 0)
+                objective_vars.append(abs_diff)
+                objective_coefs.append(fairness_penalty)
+
+    model.Maximize(cp_model.LinearExpr.WeightedSum(objective_vars, objective_coefs))
 
     solver = cp_model.CpSolver()
     solver.parameters.max_time_in_seconds = float(weights.get("max_solve_seconds", 15))
@@ -484,25 +501,22 @@ def solve_schedule(parish, instances, consolidation_days, weights, allow_changes
     changes = 0
     coverage = 0
     preference_total = 0
-    assignment_counts = []
+    solved_counts = defaultdict(int)
 
     for slot in decision_slots:
         assigned_acolyte = None
         for acolyte in candidates.get(slot.id, []):
             if solver.Value(x[(slot.id, acolyte.id)]) == 1:
                 assigned_acolyte = acolyte
-                context = context_by_slot.get(slot.id)
-                local_count = local_eligible_count_by_slot.get(slot.id, 0)
-                preference_total += score_candidate(
-                    acolyte,
-                    slot,
-                    context,
-                    cache,
-                    local_eligible_count=local_count,
-                )
+                preference_total += candidate_scores[(slot.id, acolyte.id)]
+                solved_counts[acolyte.id] += 1
                 break
         if assigned_acolyte:
             coverage += 1
+            prefetched = slot.get_active_assignment()
+            if prefetched and prefetched.acolyte_id == assigned_acolyte.id:
+                # Unchanged by this solve; skip the per-slot lock and transaction.
+                continue
             try:
                 with transaction.atomic():
                     locked_slot = _lock_slot(slot.id)
@@ -532,13 +546,7 @@ def solve_schedule(parish, instances, consolidation_days, weights, allow_changes
             except (ConcurrentUpdateError, ValueError):
                 continue
 
-    for acolyte in acolytes:
-        count = 0
-        for slot in decision_slots:
-            key = (slot.id, acolyte.id)
-            if key in x and solver.Value(x[key]) == 1:
-                count += 1
-        assignment_counts.append(count)
+    assignment_counts = [solved_counts[acolyte.id] for acolyte in acolytes]
     if assignment_counts:
         mean = sum(assignment_counts) / len(assignment_counts)
         variance = sum((value - mean) ** 2 for value in assignment_counts) / len(assignment_counts)
@@ -587,8 +595,12 @@ def solve_open_slots(parish, slots, weights):
             assigned_map={},
         )
 
-    preferences = AcolytePreference.objects.filter(parish=parish)
-    intents = {intent.acolyte_id: intent for intent in AcolyteIntent.objects.filter(parish=parish)}
+    intents = {
+        acolyte_id: (desired_frequency, willingness_level)
+        for acolyte_id, desired_frequency, willingness_level in AcolyteIntent.objects.filter(
+            parish=parish, acolyte_id__in=[acolyte.id for acolyte in acolytes]
+        ).values_list("acolyte_id", "desired_frequency_per_month", "willingness_level")
+    }
     cache = build_recommendation_cache(parish, slots=decision_slots, acolytes=acolytes)
     cache["weights"] = weights
 
@@ -604,7 +616,7 @@ def solve_open_slots(parish, slots, weights):
             deferred_slots.append(slot)
             continue
         slot_candidates = []
-        for acolyte in acolytes:
+        for acolyte in qualified_acolytes(cache, slot.position_type_id):
             if not is_candidate_eligible_static(acolyte, slot, context, cache):
                 continue
             if not is_candidate_eligible_dynamic(acolyte, slot, cache):
@@ -679,9 +691,12 @@ def solve_open_slots(parish, slots, weights):
     model = cp_model.CpModel()
     x = {}
 
+    # (mass_instance_id, acolyte_id) -> that acolyte's vars across the mass's slots.
+    mass_vars = defaultdict(list)
     for slot in decision_slots:
         for acolyte in candidates.get(slot.id, []):
             x[(slot.id, acolyte.id)] = model.NewBoolVar(f"x_{slot.id}_{acolyte.id}")
+            mass_vars[(slot.mass_instance_id, acolyte.id)].append(x[(slot.id, acolyte.id)])
 
     for slot in decision_slots:
         vars_for_slot = [x[(slot.id, a.id)] for a in candidates.get(slot.id, [])]
@@ -691,11 +706,9 @@ def solve_open_slots(parish, slots, weights):
     slots_by_mass = defaultdict(list)
     for slot in decision_slots:
         slots_by_mass[slot.mass_instance_id].append(slot)
-    for mass_slots in slots_by_mass.values():
-        for acolyte in acolytes:
-            vars_for_acolyte = [x[(slot.id, acolyte.id)] for slot in mass_slots if (slot.id, acolyte.id) in x]
-            if vars_for_acolyte:
-                model.Add(sum(vars_for_acolyte) <= 1)
+    for vars_for_acolyte in mass_vars.values():
+        if len(vars_for_acolyte) > 1:
+            model.Add(sum(vars_for_acolyte) <= 1)
 
     senior_ids = {acolyte.id for acolyte in acolytes if acolyte.experience_level == "senior"}
     if senior_ids:
@@ -716,44 +729,43 @@ def solve_open_slots(parish, slots, weights):
     mass_duration = int(getattr(parish, "default_mass_duration_minutes", 60))
     rest_minutes = int(getattr(parish, "min_rest_minutes_between_masses", 0))
     min_gap = (mass_duration + rest_minutes) * 60
-    sorted_slots = sorted(decision_slots, key=lambda slot: slot.mass_instance.starts_at)
+    starts_by_slot = {slot.id: slot.mass_instance.starts_at for slot in decision_slots}
+    week_by_slot = {slot_id: starts.isocalendar()[:2] for slot_id, starts in starts_by_slot.items()}
+    sorted_slots = sorted(decision_slots, key=lambda slot: starts_by_slot[slot.id])
     conflict_pairs = []
     for idx, slot_a in enumerate(sorted_slots):
-        a_start = slot_a.mass_instance.starts_at
-        for slot_b in sorted_slots[idx + 1 :]:
-            if slot_a.mass_instance_id == slot_b.mass_instance_id:
-                continue
-            b_start = slot_b.mass_instance.starts_at
-            if (b_start - a_start).total_seconds() >= min_gap:
+        a_start = starts_by_slot[slot_a.id]
+        next_idx = idx + 1
+        while next_idx < len(sorted_slots):
+            slot_b = sorted_slots[next_idx]
+            if (starts_by_slot[slot_b.id] - a_start).total_seconds() >= min_gap:
                 break
-            conflict_pairs.append((slot_a, slot_b))
-    for acolyte in acolytes:
-        for slot_a, slot_b in conflict_pairs:
-            if (slot_a.id, acolyte.id) in x and (slot_b.id, acolyte.id) in x:
-                model.Add(x[(slot_a.id, acolyte.id)] + x[(slot_b.id, acolyte.id)] <= 1)
+            if slot_a.mass_instance_id != slot_b.mass_instance_id:
+                conflict_pairs.append((slot_a, slot_b))
+            next_idx += 1
+    # Only acolytes that are candidates for both slots of a pair can conflict.
+    candidate_ids = {slot.id: {acolyte.id for acolyte in candidates.get(slot.id, [])} for slot in decision_slots}
+    for slot_a, slot_b in conflict_pairs:
+        for acolyte_id in candidate_ids[slot_a.id] & candidate_ids[slot_b.id]:
+            model.Add(x[(slot_a.id, acolyte_id)] + x[(slot_b.id, acolyte_id)] <= 1)
 
     decision_week_counts = defaultdict(lambda: defaultdict(int))
     if decision_slots:
-        active_assignments = (
-            Assignment.objects.filter(
-                parish=parish,
-                is_active=True,
-                assignment_state__in=["proposed", "published", "locked"],
-                slot_id__in=[slot.id for slot in decision_slots],
-            )
-            .select_related("slot__mass_instance")
-        )
-        for assignment in active_assignments:
-            start = assignment.slot.mass_instance.starts_at
+        active_assignments = Assignment.objects.filter(
+            parish=parish,
+            is_active=True,
+            assignment_state__in=["proposed", "published", "locked"],
+            slot_id__in=[slot.id for slot in decision_slots],
+        ).values_list("acolyte_id", "slot__mass_instance__starts_at")
+        for acolyte_id, start in active_assignments:
             week_key = start.isocalendar()[:2]
-            decision_week_counts[assignment.acolyte_id][week_key] += 1
+            decision_week_counts[acolyte_id][week_key] += 1
 
     max_services_per_week = weights.get("max_services_per_week")
     if max_services_per_week:
         slots_by_week = defaultdict(list)
         for slot in decision_slots:
-            key = slot.mass_instance.starts_at.isocalendar()[:2]
-            slots_by_week[key].append(slot)
+            slots_by_week[week_by_slot[slot.id]].append(slot)
         for week_key, week_slots in slots_by_week.items():
             for acolyte in acolytes:
                 existing = cache["weekly_counts_by_acolyte"].get(acolyte.id, {}).get(week_key, 0)
@@ -771,9 +783,10 @@ def solve_open_slots(parish, slots, weights):
     if max_consecutive_weekends:
         weekend_map = defaultdict(list)
         for slot in decision_slots:
-            weekday = slot.mass_instance.starts_at.weekday()
+            starts = starts_by_slot[slot.id]
+            weekday = starts.weekday()
             if weekday in (5, 6):
-                date = slot.mass_instance.starts_at.date()
+                date = starts.date()
                 if weekday == 6:
                     date = date - timedelta(days=1)
                 weekend_map[date].append(slot)
@@ -801,34 +814,43 @@ def solve_open_slots(parish, slots, weights):
                     if vars_in_window:
                         model.Add(sum(vars_in_window) <= int(max_consecutive_weekends))
 
-    preference_terms = []
-    fairness_terms = []
-    partner_terms = []
-    family_terms = []
+    objective_vars = []
+    objective_coefs = []
+    # (slot_id, acolyte_id) -> score, reused when totalling the chosen assignments.
+    candidate_scores = {}
 
     for slot in decision_slots:
         context = context_by_slot.get(slot.id)
         local_count = local_eligible_count_by_slot.get(slot.id, 0)
         for acolyte in candidates.get(slot.id, []):
-            base_score = score_candidate(
-                acolyte,
-                slot,
-                context,
-                cache,
-                local_eligible_count=local_count,
-            )
-            preference_terms.append(base_score * x[(slot.id, acolyte.id)])
-
-    partner_prefs = [pref for pref in preferences if pref.preference_type in ["preferred_partner", "avoid_partner"] and pref.target_acolyte_id]
+            key = (slot.id, acolyte.id)
+            if key not in candidate_scores:
+                candidate_scores[key] = score_candidate(
+                    acolyte,
+                    slot,
+                    context,
+                    cache,
+                    local_eligible_count=local_count,
+                )
+            objective_vars.append(x[key])
+            objective_coefs.append(candidate_scores[key])
+
+    partner_prefs = list(
+        AcolytePreference.objects.filter(
+            parish=parish,
+            preference_type__in=["preferred_partner", "avoid_partner"],
+            target_acolyte__isnull=False,
+        ).only("acolyte_id", "target_acolyte_id", "preference_type", "weight")
+    )
     if partner_prefs:
         partner_ids = set()
         for pref in partner_prefs:
             partner_ids.add(pref.acolyte_id)
             partner_ids.add(pref.target_acolyte_id)
         mass_acolyte_vars = defaultdict(dict)
-        for mass_id, mass_slots in slots_by_mass.items():
+        for mass_id in slots_by_mass:
             for acolyte_id in partner_ids:
-                vars_for_acolyte = [x[(slot.id, acolyte_id)] for slot in mass_slots if (slot.id, acolyte_id) in x]
+                vars_for_acolyte = mass_vars.get((mass_id, acolyte_id))
                 if not vars_for_acolyte:
                     continue
                 assigned_var = model.NewBoolVar(f"mass_{mass_id}_a_{acolyte_id}")
@@ -849,7 +871,8 @@ def solve_open_slots(parish, slots, weights):
                 weight = pref.weight or 0
                 if pref.preference_type == "avoid_partner":
                     weight = -weight
-                partner_terms.append(weight * pair_var)
+                objective_vars.append(pair_var)
+                objective_coefs.append(weight)
 
     family_bonus = int(weights.get("family_group_bonus", 2))
     if family_bonus:
@@ -860,14 +883,10 @@ def solve_open_slots(parish, slots, weights):
         for family_id, members in families.items():
             if len(members) < 2:
                 continue
-            for mass_id, mass_slots in slots_by_mass.items():
+            for mass_id in slots_by_mass:
                 member_vars = {}
                 for acolyte_id in members:
-                    vars_for_acolyte = [
-                        x[(slot.id, acolyte_id)]
-                        for slot in mass_slots
-                        if (slot.id, acolyte_id) in x
-                    ]
+                    vars_for_acolyte = mass_vars.get((mass_id, acolyte_id))
                     if not vars_for_acolyte:
                         continue
                     assigned_var = model.NewBoolVar(f"family_{family_id}_{mass_id}_{acolyte_id}")
@@ -882,24 +901,24 @@ def solve_open_slots(parish, slots, weights):
                         model.Add(pair_var <= member_vars[acolyte_id])
                         model.Add(pair_var <= member_vars[other_id])
                         model.Add(pair_var >= member_vars[acolyte_id] + member_vars[other_id] - 1)
-                        family_terms.append(family_bonus * pair_var)
+                        objective_vars.append(pair_var)
+                        objective_coefs.append(family_bonus)
 
     horizon_days = 30
     if decision_slots:
-        starts = [slot.mass_instance.starts_at for slot in decision_slots]
+        starts = list(starts_by_slot.values())
         horizon_days = max((max(starts) - min(starts)).days, 1)
 
     if acolytes:
         base_target = len(decision_slots) / len(acolytes)
         raw_targets = {}
         for acolyte in acolytes:
-            intent = intents.get(acolyte.id)
+            desired_frequency, level = intents.get(acolyte.id, (None, "normal"))
             if acolyte.scheduling_mode == "reserve":
                 raw_target = 0
-            elif intent and intent.desired_frequency_per_month:
-                raw_target = intent.desired_frequency_per_month * (horizon_days / 30)
+            elif desired_frequency:
+                raw_target = desired_frequency * (horizon_days / 30)
             else:
-                level = getattr(intent, "willingness_level", "normal") if intent else "normal"
                 factor = {"low": 0.8, "normal": 1.0, "high": 1.2}.get(level, 1.0)
                 raw_target = base_target * factor
             raw_targets[acolyte.id] = raw_target
@@ -907,6 +926,7 @@ def solve_open_slots(parish, slots, weights):
         scale = len(decision_slots) / total_raw
         target_loads = {acolyte_id: int(round(raw * scale)) for acolyte_id, raw in raw_targets.items()}
 
+        fairness_penalty = -weights.get("fairness_penalty", 1)
         for acolyte in acolytes:
             vars_for_acolyte = [x[(slot.id, acolyte.id)] for slot in decision_slots if (slot.id, acolyte.id) in x]
             if vars_for_acolyte:
@@ -915,19 +935,10 @@ def solve_open_slots(parish, slots, weights):
                 model.Add(diff == sum(vars_for_acolyte) - target)
                 abs_diff = model.NewIntVar(0, len(decision_slots), f"abs_diff_{acolyte.id}")
                 model.AddAbsEquality(abs_diff, diff)
-                fairness_terms.append(abs_diff)
-
-    objective_terms = []
-    if preference_terms:
-        objective_terms.append(sum(preference_terms))
-    if fairness_terms:
-        objective_terms.append(-weights.get("fairness_penalty", 1) * sum(fairness_terms))
-    if partner_terms:
-        objective_terms.append(sum(partner_terms))
-    if family_terms:
-        objective_terms.append(sum(family_terms))
+                objective_vars.append(abs_diff)
+                objective_coefs.append(fairness_penalty)
 
-    model.Maximize(sum(objective_terms) if objective_terms else 0)
+    model.Maximize(cp_model.LinearExpr.WeightedSum(objective_vars, objective_coefs))
 
     solver = cp_model.CpSolver()
     solver.parameters.max_time_in_seconds = float(weights.get("max_solve_seconds", 15))
@@ -949,30 +960,17 @@ def solve_open_slots(parish, slots, weights):
     assigned_map = {}
     preference_total = 0
     coverage = 0
+    solved_counts = defaultdict(int)
     for slot in decision_slots:
         for acolyte in candidates.get(slot.id, []):
             if solver.Value(x[(slot.id, acolyte.id)]) == 1:
                 assigned_map[slot.id] = acolyte
                 coverage += 1
-                context = context_by_slot.get(slot.id)
-                local_count = local_eligible_count_by_slot.get(slot.id, 0)
-                preference_total += score_candidate(
-                    acolyte,
-                    slot,
-                    context,
-                    cache,
-                    local_eligible_count=local_count,
-                )
+                preference_total += candidate_scores[(slot.id, acolyte.id)]
+                solved_counts[acolyte.id] += 1
                 break
 
-    assignment_counts = []
-    for acolyte in acolytes:
-        count = 0
-        for slot in decision_slots:
-            key = (slot.id, acolyte.id)
-            if key in x and solver.Value(x[key]) == 1:
-                count += 1
-        assignment_counts.append(count)
+    assignment_counts = [solved_counts[acolyte.id] for acolyte in acolytes]
     if assignment_counts:
         mean = sum(assignment_counts) / len(assignment_counts)
         variance = sum((value - mean) ** 2 for value in assignment_counts) / len(assignment_counts)
@@ -2,7 +2,7 @@ from django.test import TestCase
 
 from core.models import Parish
 from scheduler.models import ScheduleJobRequest
-from scheduler.services.jobs import claim_job
+from scheduler.services.jobs import claim_job, claim_pending_jobs
 
 
 class JobClaimTests(TestCase):
@@ -13,3 +13,26 @@ class JobClaimTests(TestCase):
         second = claim_job(job.id)
         self.assertTrue(first)
         self.assertFalse(second)
+
+    def test_claim_pending_jobs_claims_batch_once(self):
+        parish = Parish.objects.create(name="Parish")
+        other_parish = Parish.objects.create(name="Other")
+        jobs = [ScheduleJobRequest.objects.create(parish=parish, status="pending") for _ in range(3)]
+        ScheduleJobRequest.objects.create(parish=parish, status="success")
+        other_job = ScheduleJobRequest.objects.create(parish=other_parish, status="pending")
+
+        claimed = claim_pending_jobs(parish_id=parish.id, limit=2)
+        self.assertEqual([job.id for job in claimed], [jobs[0].id, jobs[1].id])
+        self.assertTrue(all(job.status == "running" and job.started_at for job in claimed))
+        self.assertEqual([job.id for job in claim_pending_jobs(parish_id=parish.id)], [jobs[2].id])
+        self.assertEqual(claim_pending_jobs(parish_id=parish.id), [])
+        other_job.refresh_from_db()
+        self.assertEqual(other_job.status, "pending")
+
+    def test_claim_pending_jobs_defaults_to_one_job(self):
+        parish = Parish.objects.create(name="Parish")
+        jobs = [ScheduleJobRequest.objects.create(parish=parish, status="pending") for _ in range(2)]
+
+        self.assertEqual([job.id for job in claim_pending_jobs()], [jobs[0].id])
+        jobs[1].refresh_from_db()
+        self.assertEqual(jobs[1].status, "pending")
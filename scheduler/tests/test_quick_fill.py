@@ -4,6 +4,7 @@ from django.test import TestCase
 from django.utils import timezone
 
 from core.models import (
+    AcolyteAvailabilityRule,
     AcolyteProfile,
     AcolyteQualification,
     Assignment,
@@ -13,7 +14,7 @@ from core.models import (
     Parish,
     PositionType,
 )
-from scheduler.services.quick_fill import quick_fill_slot
+from scheduler.services.quick_fill import build_quick_fill_cache, quick_fill_slot
 
 
 class QuickFillSlotTests(TestCase):
@@ -99,3 +100,25 @@ class QuickFillSlotTests(TestCase):
         self.acolyte_b.save(update_fields=["scheduling_mode"])
         candidates = quick_fill_slot(self.slot1, self.parish)
         self.assertEqual(candidates[0].id, self.acolyte_a.id)
+
+    def test_quick_fill_cache_limits_positions(self):
+        """build_quick_fill_cache keeps only the requested positions"""
+        cache = build_quick_fill_cache(self.parish, position_type_ids=[self.position.id])
+        self.assertEqual(set(cache["qualified_by_position"]), {self.position.id})
+        self.assertEqual(quick_fill_slot(self.slot2, self.parish, cache=cache), [])
+        self.assertEqual(len(quick_fill_slot(self.slot1, self.parish, cache=cache)), 3)
+
+    def test_quick_fill_checks_availability_once_per_mass(self):
+        """slots of the same mass reuse the availability answer for each acolyte"""
+        AcolyteAvailabilityRule.objects.create(
+            parish=self.parish,
+            acolyte=self.acolyte_c,
+            rule_type="unavailable",
+            day_of_week=self.instance.starts_at.weekday(),
+        )
+        cache = build_quick_fill_cache(self.parish, slots=[self.slot1, self.slot2])
+        for slot in (self.slot1, self.slot2):
+            candidate_ids = {acolyte.id for acolyte in quick_fill_slot(slot, self.parish, cache=cache)}
+            self.assertEqual(candidate_ids, {self.acolyte_a.id, self.acolyte_b.id})
+        self.assertEqual(len(cache["availability"]), 3)
+        self.assertFalse(cache["availability"][(self.acolyte_c.id, self.instance.id)])
@@ -0,0 +1,98 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import (
+    AcolyteProfile,
+    AcolyteQualification,
+    AssignmentSlot,
+    Community,
+    MassInstance,
+    Parish,
+    PositionType,
+)
+from notifications.models import Notification
+from scheduler.models import ScheduleJobRequest
+
+
+class RunGlobalSchedulerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parish = Parish.objects.create(name="Parish")
+        community = Community.objects.create(parish=cls.parish, code="MAT", name="Matriz")
+        position = PositionType.objects.create(parish=cls.parish, code="LIB", name="Libriferario")
+        cls.slots = []
+        for index in range(2):
+            instance = MassInstance.objects.create(
+                parish=cls.parish,
+                community=community,
+                starts_at=timezone.now() + timedelta(days=3 + index),
+                status="scheduled",
+            )
+            cls.slots.append(AssignmentSlot.objects.create(parish=cls.parish, mass_instance=instance, position_type=position))
+        for index in range(2):
+            user = get_user_model().objects.create_user(
+                email=f"acolito{index}@example.com", full_name=f"Acolito {index}", password="pass"
+            )
+            acolyte = AcolyteProfile.objects.create(parish=cls.parish, user=user, display_name=f"Acolito {index}")
+            AcolyteQualification.objects.create(parish=cls.parish, acolyte=acolyte, position_type=position, qualified=True)
+
+    def test_replacement_job_assigns_and_notifies(self):
+        job = ScheduleJobRequest.objects.create(
+            parish=self.parish,
+            job_type="replacement",
+            payload_json={"slot_ids": [slot.id for slot in self.slots], "slot_id": self.slots[0].id},
+        )
+
+        call_command("run_global_scheduler", stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "success")
+        self.assertEqual(job.summary_json["changes"], 2)
+        notifications = Notification.objects.filter(parish=self.parish, template_code="REPLACEMENT_ASSIGNED")
+        self.assertEqual(notifications.count(), 2)
+        self.assertTrue(all(notification.status == "pending" for notification in notifications))
+
+    def test_notification_failure_keeps_job_result(self):
+        job = ScheduleJobRequest.objects.create(
+            parish=self.parish,
+            job_type="replacement",
+            payload_json={"slot_ids": [slot.id for slot in self.slots]},
+        )
+        stderr = StringIO()
+
+        with patch(
+            "scheduler.management.commands.run_global_scheduler.enqueue_notifications",
+            side_effect=RuntimeError("queue down"),
+        ):
+            call_command("run_global_scheduler", stdout=StringIO(), stderr=stderr)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "success")
+        self.assertEqual(job.summary_json["changes"], 2)
+        self.assertEqual(job.summary_json["coverage"], 2)
+        self.assertIn("queue down", stderr.getvalue())
+        self.assertFalse(Notification.objects.filter(parish=self.parish).exists())
+
+    def test_claimed_jobs_use_the_joined_parish(self):
+        jobs = [
+            ScheduleJobRequest.objects.create(parish=self.parish, job_type="replacement", payload_json={"slot_ids": []})
+            for _ in range(3)
+        ]
+
+        with CaptureQueriesContext(connection) as ctx:
+            call_command("run_global_scheduler", claim_batch=3, stdout=StringIO())
+
+        parish_query = f'SELECT "{Parish._meta.db_table}"'
+        self.assertFalse([query for query in ctx.captured_queries if query["sql"].startswith(parish_query)])
+        for job in jobs:
+            job.refresh_from_db()
+            self.assertEqual(job.status, "success")
+            self.assertIsNotNone(job.finished_at)
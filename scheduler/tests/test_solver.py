@@ -1,11 +1,14 @@
 from collections import defaultdict
 from datetime import timedelta
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from core.models import (
     AcolyteAvailabilityRule,
+    AcolytePreference,
     AcolyteProfile,
     AcolyteQualification,
     Assignment,
@@ -18,7 +21,7 @@ from core.models import (
     RequirementProfile,
     RequirementProfilePosition,
 )
-from scheduler.services.solver import solve_schedule
+from scheduler.services.solver import _ensure_slots, solve_schedule
 
 
 class SolverTests(TestCase):
@@ -41,6 +44,59 @@ class SolverTests(TestCase):
         self.assertIsNotNone(slot.get_active_assignment())
         self.assertEqual(result.coverage, 1)
 
+    def test_ensure_slots_creates_missing_slots_in_one_insert(self):
+        parish = Parish.objects.create(name="Parish")
+        community = Community.objects.create(parish=parish, code="MAT", name="Matriz")
+        lib = PositionType.objects.create(parish=parish, code="LIB", name="Libriferario")
+        cer = PositionType.objects.create(parish=parish, code="CER", name="Ceroferario")
+        profile = RequirementProfile.objects.create(parish=parish, name="Solene")
+        RequirementProfilePosition.objects.create(profile=profile, position_type=lib, quantity=1)
+        RequirementProfilePosition.objects.create(profile=profile, position_type=cer, quantity=2)
+        instances = [
+            MassInstance.objects.create(
+                parish=parish,
+                community=community,
+                starts_at=timezone.now() + timedelta(days=3 + index),
+                status="scheduled",
+                requirement_profile=profile,
+            )
+            for index in range(2)
+        ]
+        existing = AssignmentSlot.objects.create(
+            parish=parish, mass_instance=instances[0], position_type=cer, slot_index=1, required=False
+        )
+
+        with self.assertNumQueries(2):
+            _ensure_slots(instances)
+
+        self.assertEqual(AssignmentSlot.objects.filter(mass_instance__in=instances).count(), 6)
+        existing.refresh_from_db()
+        self.assertFalse(existing.required)
+
+    def test_resolve_skips_unchanged_slots(self):
+        parish = Parish.objects.create(name="Parish")
+        community = Community.objects.create(parish=parish, code="MAT", name="Matriz")
+        position = PositionType.objects.create(parish=parish, code="LIB", name="Libriferario")
+        acolyte = AcolyteProfile.objects.create(parish=parish, display_name="Acolyte")
+        AcolyteQualification.objects.create(parish=parish, acolyte=acolyte, position_type=position, qualified=True)
+        instance = MassInstance.objects.create(
+            parish=parish,
+            community=community,
+            starts_at=timezone.now() + timedelta(days=3),
+            status="scheduled",
+        )
+        slot = AssignmentSlot.objects.create(parish=parish, mass_instance=instance, position_type=position)
+        solve_schedule(parish, [instance], parish.consolidation_days, {}, allow_changes=True)
+        assignment = slot.get_active_assignment()
+
+        with CaptureQueriesContext(connection) as ctx:
+            result = solve_schedule(parish, [instance], parish.consolidation_days, {}, allow_changes=True)
+
+        self.assertEqual(result.changes, 0)
+        self.assertEqual(result.coverage, 1)
+        self.assertEqual(slot.get_active_assignment().id, assignment.id)
+        self.assertFalse([query for query in ctx.captured_queries if query["sql"].startswith("SAVEPOINT")])
+
     def test_rotation_considers_historical_assignments(self):
         parish = Parish.objects.create(name="Parish")
         community = Community.objects.create(parish=parish, code="MAT", name="Matriz")
@@ -112,6 +168,68 @@ class SolverTests(TestCase):
         self.assertEqual(result.required_slots_count, 1)
         self.assertEqual(result.coverage, 1)
 
+    def test_solver_splits_overlapping_masses_between_acolytes(self):
+        parish = Parish.objects.create(name="Parish")
+        community = Community.objects.create(parish=parish, code="MAT", name="Matriz")
+        position = PositionType.objects.create(parish=parish, code="LIB", name="Libriferario")
+        # The reserve acolyte is only chosen because the masses overlap.
+        for name, mode in (("Acolito A", "normal"), ("Acolito B", "reserve")):
+            acolyte = AcolyteProfile.objects.create(parish=parish, display_name=name, scheduling_mode=mode)
+            AcolyteQualification.objects.create(parish=parish, acolyte=acolyte, position_type=position, qualified=True)
+
+        starts_at = timezone.now() + timedelta(days=2)
+        instances = [
+            MassInstance.objects.create(
+                parish=parish,
+                community=community,
+                starts_at=starts_at + timedelta(minutes=30 * index),
+                status="scheduled",
+            )
+            for index in range(2)
+        ]
+        slots = [
+            AssignmentSlot.objects.create(parish=parish, mass_instance=instance, position_type=position)
+            for instance in instances
+        ]
+
+        result = solve_schedule(parish, instances, parish.consolidation_days, {}, allow_changes=True)
+
+        self.assertEqual(result.coverage, 2)
+        assigned = {slot.get_active_assignment().acolyte_id for slot in slots}
+        self.assertEqual(len(assigned), 2)
+
+    def test_solver_honors_avoid_partner_preference(self):
+        parish = Parish.objects.create(name="Parish")
+        community = Community.objects.create(parish=parish, code="MAT", name="Matriz")
+        position = PositionType.objects.create(parish=parish, code="LIB", name="Libriferario")
+        acolytes = []
+        for name in ("Acolito A", "Acolito B", "Acolito C"):
+            acolyte = AcolyteProfile.objects.create(parish=parish, display_name=name)
+            AcolyteQualification.objects.create(parish=parish, acolyte=acolyte, position_type=position, qualified=True)
+            acolytes.append(acolyte)
+        AcolytePreference.objects.create(
+            parish=parish,
+            acolyte=acolytes[0],
+            preference_type="avoid_partner",
+            target_acolyte=acolytes[1],
+            weight=100,
+        )
+        instance = MassInstance.objects.create(
+            parish=parish,
+            community=community,
+            starts_at=timezone.now() + timedelta(days=2),
+            status="scheduled",
+        )
+        slots = [
+            AssignmentSlot.objects.create(parish=parish, mass_instance=instance, position_type=position, slot_index=index)
+            for index in (1, 2)
+        ]
+
+        solve_schedule(parish, [instance], parish.consolidation_days, {}, allow_changes=True)
+
+        assigned = {slot.get_active_assignment().acolyte_id for slot in slots}
+        self.assertNotEqual(assigned, {acolytes[0].id, acolytes[1].id})
+
     def test_solver_ignores_canceled_instances(self):
         parish = Parish.objects.create(name="Parish")
         community = Community.objects.create(parish=parish, code="MAT", name="Matriz")
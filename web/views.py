@@ -88,7 +88,7 @@ from core.services.availability import is_acolyte_available, is_acolyte_availabl
 from core.services.acolytes import deactivate_future_assignments_for_acolyte
 from core.services.time_windows import filter_past, filter_upcoming
 from scheduler.models import ScheduleJobRequest
-from notifications.services import enqueue_notification
+from notifications.services import enqueue_notification, enqueue_notification_for_users
 from scheduler.services.quick_fill import build_quick_fill_cache, quick_fill_slot
 from core.services.recommendations import build_recommendation_cache, get_mass_context, rank_candidates
 from web.forms import (
@@ -5892,14 +5892,13 @@ def swap_request_accept(request, swap_id):
     if parish.swap_requires_approval:
         swap.status = "awaiting_approval"
         swap.save(update_fields=["status", "updated_at"])
-        for user in users_with_roles(parish, ADMIN_ROLE_CODES):
-            enqueue_notification(
-                parish,
-                user,
-                "SWAP_REQUESTED",
-                {"swap_id": swap.id},
-                idempotency_key=f"swap:{swap.id}:approval:{user.id}",
-            )
+        enqueue_notification_for_users(
+            parish,
+            users_with_roles(parish, ADMIN_ROLE_CODES),
+            "SWAP_REQUESTED",
+            {"swap_id": swap.id},
+            idempotency_prefix=f"swap:{swap.id}:approval",
+        )
         if swap.requestor_acolyte.user:
             enqueue_notification(
                 parish,
@@ -6286,14 +6285,13 @@ def decline_assignment(request, assignment_id):
             notes=f"Criada por recusa de {assignment.acolyte.display_name}",
         )
         if parish.notify_on_cancellation:
-            for user in users_with_roles(parish, ADMIN_ROLE_CODES):
-                enqueue_notification(
-                    parish,
-                    user,
-                    "ASSIGNMENT_CANCELED_ALERT_ADMIN",
-                    {"slot_id": slot.id},
-                    idempotency_key=f"cancel:{assignment.id}:{user.id}",
-                )
+            enqueue_notification_for_users(
+                parish,
+                users_with_roles(parish, ADMIN_ROLE_CODES),
+                "ASSIGNMENT_CANCELED_ALERT_ADMIN",
+                {"slot_id": slot.id},
+                idempotency_prefix=f"cancel:{assignment.id}",
+            )
         if parish.auto_assign_on_decline and replacement:
             ScheduleJobRequest.objects.create(
                 parish=parish,
@@ -6371,14 +6369,13 @@ def cancel_assignment(request, assignment_id):
             notes=f"Criada por cancelamento de {assignment.acolyte.display_name}",
         )
         if parish.notify_on_cancellation:
-            for user in users_with_roles(parish, ADMIN_ROLE_CODES):
-                enqueue_notification(
-                    parish,
-                    user,
-                    "ASSIGNMENT_CANCELED_ALERT_ADMIN",
-                    {"slot_id": slot.id},
-                    idempotency_key=f"cancel:{assignment.id}:{user.id}",
-                )
+            enqueue_notification_for_users(
+                parish,
+                users_with_roles(parish, ADMIN_ROLE_CODES),
+                "ASSIGNMENT_CANCELED_ALERT_ADMIN",
+                {"slot_id": slot.id},
+                idempotency_prefix=f"cancel:{assignment.id}",
+            )
     
     # For HTMX, return empty response with success message (will remove the card)
     if request.headers.get("HX-Request"):